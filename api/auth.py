@@ -1,74 +1,60 @@
-from fastapi import HTTPException, Security, Depends
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials, APIKeyHeader
+import hmac
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Optional
+from fastapi import HTTPException, Security, Request
+from fastapi.security import APIKeyHeader
 from .config import settings
 
-# Simple API Key authentication for demo
-api_key_header = APIKeyHeader(name="X-API-Key", auto_error=False)
-bearer_scheme = HTTPBearer(auto_error=False)
+# Simple API Key authentication for demo. This is the only scheme registered
+# in OpenAPI; bearer tokens are read from the Authorization header directly.
+api_key_header = APIKeyHeader(name="X-API-Key", scheme_name="Auth", auto_error=False)
 
-async def verify_api_key(api_key: str = Security(api_key_header)):
-    """Verify API key authentication"""
-    if not api_key:
-        raise HTTPException(
-            status_code=401,
-            detail="API key required",
-            headers={"WWW-Authenticate": "ApiKey"}
-        )
-    
-    if api_key != settings.api_key:
-        raise HTTPException(
-            status_code=401,
-            detail="Invalid API key",
-            headers={"WWW-Authenticate": "ApiKey"}
-        )
-    
-    return {"api_key": api_key}
+# Encode secrets once at import instead of on every request
+_API_KEY = settings.api_key.encode()
+_SECRET = settings.secret_key.encode()
 
-async def verify_bearer_token(credentials: HTTPAuthorizationCredentials = Security(bearer_scheme)):
-    """Verify Bearer token authentication (alternative to API key)"""
-    if not credentials:
-        raise HTTPException(
-            status_code=401,
-            detail="Bearer token required",
-            headers={"WWW-Authenticate": "Bearer"}
-        )
+# Shared read-only results so successful auth allocates nothing per request
+_API_KEY_RESULT = MappingProxyType({"method": "api_key", "authenticated": True})
+_BEARER_RESULT = MappingProxyType({"method": "bearer", "authenticated": True})
+_ANONYMOUS_RESULT = MappingProxyType({"method": "none", "authenticated": False})
+
+@lru_cache(maxsize=1024)
+def _check_api_key(api_key: str) -> bool:
+    """Constant-time API key comparison, cached per presented key"""
+    return hmac.compare_digest(api_key.encode(), _API_KEY)
+
+@lru_cache(maxsize=1024)
+def _check_bearer_token(token: str) -> bool:
+    """Constant-time bearer token comparison, cached per presented token"""
+    return hmac.compare_digest(token.encode(), _SECRET)
+
+def _authenticate(request: Request, api_key: Optional[str]):
+    """Resolve the auth result from the API key or the Authorization header"""
+    if api_key and _check_api_key(api_key):
+        return _API_KEY_RESULT
     
-    # Simple token validation - in production use JWT
-    if credentials.credentials != settings.secret_key:
-        raise HTTPException(
-            status_code=401,
-            detail="Invalid bearer token",
-            headers={"WWW-Authenticate": "Bearer"}
-        )
+    authorization = request.headers.get("authorization")
+    if authorization:
+        scheme, _, token = authorization.partition(" ")
+        if token and scheme.lower() == "bearer" and _check_bearer_token(token):
+            return _BEARER_RESULT
     
-    return {"token": credentials.credentials}
+    return None
 
 # Optional authentication - allows both API key and bearer token
-async def optional_auth(
-    api_key: str = Security(api_key_header), 
-    credentials: HTTPAuthorizationCredentials = Security(bearer_scheme)
-):
+async def optional_auth(request: Request, api_key: Optional[str] = Security(api_key_header)):
     """Optional authentication - allows unauthenticated access"""
-    if api_key == settings.api_key:
-        return {"method": "api_key", "authenticated": True}
-    elif credentials and credentials.credentials == settings.secret_key:
-        return {"method": "bearer", "authenticated": True}
-    else:
-        return {"method": "none", "authenticated": False}
+    return _authenticate(request, api_key) or _ANONYMOUS_RESULT
 
 # Required authentication - must have valid API key or bearer token
-async def require_auth(
-    api_key: str = Security(api_key_header), 
-    credentials: HTTPAuthorizationCredentials = Security(bearer_scheme)
-):
+async def require_auth(request: Request, api_key: Optional[str] = Security(api_key_header)):
     """Require authentication - either API key or bearer token"""
-    if api_key and api_key == settings.api_key:
-        return {"method": "api_key", "authenticated": True}
-    elif credentials and credentials.credentials == settings.secret_key:
-        return {"method": "bearer", "authenticated": True}
-    else:
+    result = _authenticate(request, api_key)
+    if result is None:
         raise HTTPException(
             status_code=401,
             detail="Authentication required. Provide either X-API-Key header or Bearer token.",
             headers={"WWW-Authenticate": "ApiKey, Bearer"}
-        )
\ No newline at end of file
+        )
+    return result
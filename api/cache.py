@@ -0,0 +1,41 @@
+import threading
+import time
+from typing import Any, Callable, Dict, Tuple
+
+class TTLCache:
+    """Small in-process cache for read-mostly report payloads"""
+
+    def __init__(self):
+        self._entries: Dict[str, Tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+        self._generation = 0
+
+    def get_or_set(self, key: str, ttl: float, compute: Callable[[], Any]) -> Any:
+        """Return the cached value for key, computing and storing it when stale"""
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            return entry[1]
+
+        return self.refresh(key, ttl, compute)
+
+    def refresh(self, key: str, ttl: float, compute: Callable[[], Any]) -> Any:
+        """Compute a fresh value for key and store it"""
+        with self._lock:
+            generation = self._generation
+
+        value = compute()
+        with self._lock:
+            # Skip storing if a clear() happened while computing
+            if generation == self._generation:
+                self._entries[key] = (time.monotonic() + ttl, value)
+        return value
+
+    def clear(self):
+        """Drop every cached entry"""
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+
+# Statistics and dashboard payloads; cleared whenever assets change
+report_cache = TTLCache()
@@ -1,7 +1,6 @@
 import os
 from typing import Optional
 from pydantic_settings import BaseSettings
-from functools import lru_cache
 
 class Settings(BaseSettings):
     # Database
@@ -37,9 +36,8 @@ class Settings(BaseSettings):
         env_file = ".env"
         case_sensitive = False
 
-@lru_cache()
-def get_settings():
-    return Settings()
+# Initialize settings once at import
+settings = Settings()
 
-# Initialize settings
-settings = get_settings()
\ No newline at end of file
+def get_settings():
+    return settings
\ No newline at end of file
@@ -1,5 +1,5 @@
 import os
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, inspect, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from .config import settings
@@ -7,15 +7,36 @@ from .config import settings
 # Ensure data directory exists
 os.makedirs("./data", exist_ok=True)
 
+_IS_SQLITE = "sqlite" in settings.database_url
+
 # Create database engine
 engine = create_engine(
     settings.database_url,
-    connect_args={"check_same_thread": False} if "sqlite" in settings.database_url else {},
+    connect_args={"check_same_thread": False} if _IS_SQLITE else {},
+    # Room for every distinct statement shape the services emit, so hot
+    # queries are compiled once and then only rebind parameters
+    query_cache_size=1200,
+    # Detect connections dropped by a database server; a SQLite file
+    # connection cannot go stale, so skip the per-checkout ping there
+    pool_pre_ping=not _IS_SQLITE,
     echo=False  # Set to True for SQL debugging
 )
 
-# Create session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Use WAL journaling with NORMAL sync so commits skip most fsyncs and readers don't block the writer"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA mmap_size=268435456")  # 256 MB
+    cursor.close()
+
+if _IS_SQLITE:
+    event.listen(engine, "connect", set_sqlite_pragmas)
+
+# Create session factory; objects keep their loaded values after commit
+# instead of re-SELECTing on the next attribute access
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
 
 # Create declarative base
 Base = declarative_base()
@@ -29,5 +50,46 @@ def get_db():
         db.close()
 
 def create_tables():
-    """Create all database tables"""
-    Base.metadata.create_all(bind=engine)
\ No newline at end of file
+    """Create all database tables and any columns or indexes missing from existing tables"""
+    Base.metadata.create_all(bind=engine)
+    
+    # create_all skips tables that already exist, so add new nullable columns
+    # and indexes explicitly
+    inspector = inspect(engine)
+    for table in Base.metadata.sorted_tables:
+        existing_columns = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing_columns or not column.nullable:
+                continue
+            column_type = column.type.compile(dialect=engine.dialect)
+            with engine.begin() as conn:
+                conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+    
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+    
+    # Search index for an assets table created before it existed
+    if _IS_SQLITE and "assets_fts" not in inspector.get_table_names():
+        from .models import ASSET_SEARCH_DDL
+        with engine.begin() as conn:
+            for statement in ASSET_SEARCH_DDL:
+                conn.exec_driver_sql(statement)
+            conn.exec_driver_sql("INSERT INTO assets_fts(assets_fts) VALUES ('rebuild')")
+    
+    # created_at format triggers for tables created before they existed; rows
+    # already stamped by the server default are padded once here
+    if _IS_SQLITE:
+        from .models import CREATED_AT_FORMAT_DDL
+        with engine.begin() as conn:
+            existing_triggers = set(conn.exec_driver_sql(
+                "SELECT name FROM sqlite_master WHERE type = 'trigger'"
+            ).scalars())
+            for table_name, statement in CREATED_AT_FORMAT_DDL.items():
+                if f"{table_name}_created_at_format" in existing_triggers:
+                    continue
+                conn.exec_driver_sql(statement)
+                conn.exec_driver_sql(
+                    f"UPDATE {table_name} SET created_at = created_at || '.000000' "
+                    "WHERE length(created_at) = 19"
+                )
\ No newline at end of file
@@ -0,0 +1,17 @@
+import orjson
+from sqlalchemy.types import Text, TypeDecorator
+
+class ORJSON(TypeDecorator):
+    """JSON column serialized with orjson and stored as TEXT"""
+    impl = Text
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return orjson.dumps(value).decode()
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return orjson.loads(value)
@@ -1,10 +1,15 @@
 from fastapi import FastAPI, Request, HTTPException
-from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse, Response
 from contextlib import asynccontextmanager
 from .database import create_tables
 from .routers import assets, analysis, reports
 from .config import settings
+from .middleware import AllowAllCORSMiddleware
+from .services.analysis_service import AnalysisService
+from .services.asset_service import statistics_refresher
+import asyncio
+import orjson
 import os
 import logging
 
@@ -12,6 +17,9 @@ import logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Expose exception details only while running with the default dev secret
+_IS_DEV = settings.secret_key == "your-super-secret-key-change-in-production"
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan events"""
@@ -26,10 +34,23 @@ async def lifespan(app: FastAPI):
     os.makedirs(settings.upload_dir, exist_ok=True)
     logger.info(f"Upload directory ready: {settings.upload_dir}")
     
+    # Shared analysis service (and its OpenAI client) for all requests
+    app.state.analysis_service = AnalysisService()
+    app.state.analysis_service.warmup()
+    
+    # Keep cached statistics warm
+    stats_refresher = asyncio.create_task(statistics_refresher.run())
+    
     yield
     
     # Shutdown
     logger.info("Shutting down GymRegister API...")
+    
+    stats_refresher.cancel()
+    try:
+        await stats_refresher
+    except asyncio.CancelledError:
+        pass
 
 # Create FastAPI app
 app = FastAPI(
@@ -37,30 +58,29 @@ app = FastAPI(
     version=settings.api_version,
     description=settings.api_description,
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
     docs_url="/docs",
     redoc_url="/redoc",
     openapi_url="/openapi.json"
 )
 
-# Add CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # Configure appropriately for production
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+# Compress larger responses (CSV export, list endpoints); streamed
+# responses are compressed chunk by chunk as they are sent
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
+# Add CORS middleware (allow-all; configure appropriately for production)
+app.add_middleware(AllowAllCORSMiddleware)
 
 # Global exception handler
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
     logger.error(f"Global exception on {request.method} {request.url}: {str(exc)}")
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=500,
         content={
             "success": False,
             "message": "Internal server error",
-            "detail": str(exc) if settings.secret_key == "your-super-secret-key-change-in-production" else "An error occurred"
+            "detail": str(exc) if _IS_DEV else "An error occurred"
         }
     )
 
@@ -69,42 +89,49 @@ app.include_router(assets.router)
 app.include_router(analysis.router)
 app.include_router(reports.router)
 
+# Static endpoint bodies, serialized once at import
+_ROOT_BYTES = orjson.dumps({
+    "message": "GymRegister API",
+    "version": settings.api_version,
+    "docs": "/docs",
+    "status": "operational"
+})
+
+_HEALTH_BYTES = orjson.dumps({
+    "status": "healthy",
+    "version": settings.api_version,
+    "timestamp": "2024-01-01T00:00:00Z"  # Would be datetime.utcnow() in real app
+})
+
+_INFO_BYTES = orjson.dumps({
+    "title": settings.api_title,
+    "version": settings.api_version,
+    "description": settings.api_description,
+    "endpoints": {
+        "assets": "/api/assets",
+        "analysis": "/api/analyze",
+        "reports": "/api/reports",
+        "documentation": "/docs"
+    },
+    "authentication": {
+        "methods": ["API Key", "Bearer Token"],
+        "headers": ["X-API-Key", "Authorization: Bearer <token>"]
+    }
+})
+
 # Health check endpoints
 @app.get("/", tags=["Health"])
-def read_root():
+async def read_root():
     """Root endpoint"""
-    return {
-        "message": "GymRegister API",
-        "version": settings.api_version,
-        "docs": "/docs",
-        "status": "operational"
-    }
+    return Response(content=_ROOT_BYTES, media_type="application/json")
 
 @app.get("/api/health", tags=["Health"])
-def health_check():
+async def health_check():
     """Health check endpoint"""
-    return {
-        "status": "healthy",
-        "version": settings.api_version,
-        "timestamp": "2024-01-01T00:00:00Z"  # Would be datetime.utcnow() in real app
-    }
+    return Response(content=_HEALTH_BYTES, media_type="application/json")
 
 # API info endpoint
 @app.get("/api/info", tags=["Info"])
-def api_info():
+async def api_info():
     """API information"""
-    return {
-        "title": settings.api_title,
-        "version": settings.api_version,
-        "description": settings.api_description,
-        "endpoints": {
-            "assets": "/api/assets",
-            "analysis": "/api/analyze",
-            "reports": "/api/reports",
-            "documentation": "/docs"
-        },
-        "authentication": {
-            "methods": ["API Key", "Bearer Token"],
-            "headers": ["X-API-Key", "Authorization: Bearer <token>"]
-        }
-    }
\ No newline at end of file
+    return Response(content=_INFO_BYTES, media_type="application/json")
@@ -0,0 +1,67 @@
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Static CORS headers, encoded once at import
+_ALLOW_CREDENTIALS = (b"access-control-allow-credentials", b"true")
+_VARY_ORIGIN = (b"vary", b"Origin")
+_PREFLIGHT_HEADERS = [
+    (b"access-control-allow-methods", b"DELETE, GET, HEAD, OPTIONS, PATCH, POST, PUT"),
+    (b"access-control-max-age", b"600"),
+    _ALLOW_CREDENTIALS,
+    _VARY_ORIGIN,
+    (b"content-length", b"0"),
+]
+
+class AllowAllCORSMiddleware:
+    """
+    Allow-all CORS handling equivalent to CORSMiddleware with every option
+    set to "*" and credentials allowed.
+
+    Requests without an Origin header (health checks, server-to-server
+    calls) pass straight through, and preflights are answered without
+    touching the rest of the stack.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        origin = None
+        preflight = False
+        requested_headers = None
+        for name, value in scope["headers"]:
+            if name == b"origin":
+                origin = value
+            elif name == b"access-control-request-method":
+                preflight = True
+            elif name == b"access-control-request-headers":
+                requested_headers = value
+
+        if origin is None:
+            await self.app(scope, receive, send)
+            return
+
+        # Credentials are allowed, so the origin is echoed rather than "*"
+        allow_origin = (b"access-control-allow-origin", origin)
+
+        if preflight and scope["method"] == "OPTIONS":
+            headers = [allow_origin, *_PREFLIGHT_HEADERS]
+            if requested_headers:
+                headers.append((b"access-control-allow-headers", requested_headers))
+            await send({"type": "http.response.start", "status": 204, "headers": headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        async def send_with_cors(message: Message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append(allow_origin)
+                headers.append(_ALLOW_CREDENTIALS)
+                headers.append(_VARY_ORIGIN)
+                message["headers"] = headers
+            await send(message)
+
+        await self.app(scope, receive, send_with_cors)
@@ -16,11 +16,12 @@ Usage:
 import sqlite3
 import shutil
 import os
+from contextlib import contextmanager
 from datetime import datetime
 from sqlalchemy.orm import Session
-from .database import engine, SessionLocal
+from .database import engine
 from .models import Base, Asset, AuditLog
-import uuid
+from .uuidv7 import uuidv7
 
 def backup_original_database(db_path: str) -> str:
     """Create backup of original database"""
@@ -48,6 +49,71 @@ def connect_old_database(db_path: str):
     conn.row_factory = sqlite3.Row  # Access columns by name
     return conn
 
+# PRAGMAs for a one-off bulk load: no rollback journal, no fsync, no FK checks
+BULK_LOAD_PRAGMAS = {
+    "journal_mode": "OFF",
+    "synchronous": "OFF",
+    "foreign_keys": "OFF",
+    "temp_store": "MEMORY",
+}
+
+# Tables whose indexes are rebuilt after loading instead of maintained per row
+BULK_LOAD_TABLES = ("assets", "audit_logs")
+
+def target_has_rows(conn) -> bool:
+    """Whether any table in the target database already holds data"""
+    return any(
+        conn.exec_driver_sql(f"SELECT EXISTS (SELECT 1 FROM {table.name})").scalar()
+        for table in Base.metadata.sorted_tables
+    )
+
+@contextmanager
+def bulk_load_mode(conn):
+    """Relax SQLite durability and defer index builds while migrating.
+    
+    Only used for an empty target: with the journal and fsync off, a crash
+    mid-load can corrupt the database file, which is then simply deleted
+    and the migration re-run. A target that already holds data is loaded
+    with its normal settings instead, since only the source is backed up.
+    """
+    if conn.dialect.name != "sqlite":
+        yield
+        return
+    
+    if target_has_rows(conn):
+        print("   ⚠️  Target database already has data, loading without bulk-load mode")
+        yield
+        return
+    
+    # Remember current settings so they can be restored afterwards
+    original_pragmas = {
+        name: conn.exec_driver_sql(f"PRAGMA {name}").scalar()
+        for name in BULK_LOAD_PRAGMAS
+    }
+    for name, value in BULK_LOAD_PRAGMAS.items():
+        conn.exec_driver_sql(f"PRAGMA {name}={value}")
+    
+    indexes = [
+        index
+        for table_name in BULK_LOAD_TABLES
+        for index in Base.metadata.tables[table_name].indexes
+    ]
+    for index in indexes:
+        index.drop(conn, checkfirst=True)
+    conn.commit()
+    
+    try:
+        yield
+    finally:
+        print("🔄 Rebuilding indexes...")
+        for index in indexes:
+            index.create(conn, checkfirst=True)
+        conn.commit()
+        
+        for name, value in original_pragmas.items():
+            conn.exec_driver_sql(f"PRAGMA {name}={value}")
+        conn.commit()
+
 def migrate_assets(old_conn, new_session: Session) -> int:
     """Migrate assets from old to new database"""
     print("🔄 Migrating assets...")
@@ -55,46 +121,46 @@ def migrate_assets(old_conn, new_session: Session) -> int:
     # Get old assets
     cursor = old_conn.cursor()
     cursor.execute("SELECT * FROM assets")
-    old_assets = cursor.fetchall()
     
-    migrated_count = 0
+    # Load existing tags once instead of querying per row
+    existing_tags = {tag for (tag,) in new_session.query(Asset.asset_tag).all()}
+    
+    now = datetime.utcnow()
+    rows = []
     skipped_count = 0
     
-    for old_asset in old_assets:
+    for old_asset in cursor:
+        if old_asset['asset_tag'] in existing_tags:
+            skipped_count += 1
+            continue
+        
         try:
-            # Check if asset already exists in new database
-            existing = new_session.query(Asset).filter(Asset.asset_tag == old_asset['asset_tag']).first()
-            if existing:
-                print(f"   ⚠️  Asset {old_asset['asset_tag']} already exists, skipping")
-                skipped_count += 1
-                continue
-            
-            # Create new asset with migrated data
-            new_asset = Asset(
-                id=str(uuid.uuid4()),  # New UUID field
-                asset_tag=old_asset['asset_tag'],
-                name=None,  # New field, will be filled later if needed
-                item_type=old_asset['item_type'],
-                description=old_asset['description'],
-                location=old_asset['location'],
-                status=old_asset['status'] or 'Active',
-                condition=old_asset['condition'] or 'Good',
-                weight=old_asset['weight'],
-                last_seen=datetime.fromisoformat(old_asset['last_seen']) if old_asset['last_seen'] else datetime.utcnow(),
-                created_at=datetime.utcnow(),  # New field
-                updated_at=datetime.utcnow(),  # New field
-                notes=old_asset['notes'],
-                metadata=None  # New field for additional data
-            )
-            
-            new_session.add(new_asset)
-            migrated_count += 1
-            print(f"   ✅ Migrated asset: {old_asset['asset_tag']}")
+            # Build new asset row with migrated data
+            rows.append({
+                'id': uuidv7(),  # New UUID field
+                'asset_tag': old_asset['asset_tag'],
+                'name': None,  # New field, will be filled later if needed
+                'item_type': old_asset['item_type'],
+                'description': old_asset['description'],
+                'location': old_asset['location'],
+                'status': old_asset['status'] or 'Active',
+                'condition': old_asset['condition'] or 'Good',
+                'weight': old_asset['weight'],
+                'last_seen': datetime.fromisoformat(old_asset['last_seen']) if old_asset['last_seen'] else now,
+                'notes': old_asset['notes']
+            })
+            existing_tags.add(old_asset['asset_tag'])
             
         except Exception as e:
             print(f"   ❌ Failed to migrate asset {old_asset['asset_tag']}: {e}")
     
-    new_session.commit()
+    # Insert all rows in one statement batch; committed with the whole migration
+    new_session.bulk_insert_mappings(Asset, rows)
+    new_session.flush()
+    
+    migrated_count = len(rows)
+    if skipped_count:
+        print(f"   ⚠️  {skipped_count} assets already exist, skipped")
     print(f"✅ Assets migration complete: {migrated_count} migrated, {skipped_count} skipped")
     return migrated_count
 
@@ -111,33 +177,34 @@ def migrate_audit_logs(old_conn, new_session: Session) -> int:
     
     # Get old audit logs
     cursor.execute("SELECT * FROM audit_log")
-    old_logs = cursor.fetchall()
     
-    migrated_count = 0
+    now = datetime.utcnow()
+    rows = []
     
-    for old_log in old_logs:
+    for old_log in cursor:
         try:
-            # Create new audit log
-            new_log = AuditLog(
-                id=str(uuid.uuid4()),  # New UUID field
-                action=old_log['action'],
-                resource_type='asset',  # New field - assume asset for old logs
-                resource_id=None,  # New field - would need to map asset_tag to ID
-                actor='migrated_user',  # New field
-                endpoint=None,  # New field - not available in old logs
-                payload={'legacy_notes': old_log['notes']} if old_log.get('notes') else None,  # New field
-                timestamp=datetime.fromisoformat(old_log['timestamp']) if old_log['timestamp'] else datetime.utcnow(),
-                ip_address=None,  # New field - not available
-                user_agent=None  # New field - not available
-            )
-            
-            new_session.add(new_log)
-            migrated_count += 1
+            # Build new audit log row
+            rows.append({
+                'id': uuidv7(),  # New UUID field
+                'action': old_log['action'],
+                'resource_type': 'asset',  # New field - assume asset for old logs
+                'resource_id': None,  # New field - would need to map asset_tag to ID
+                'actor': 'migrated_user',  # New field
+                'endpoint': None,  # New field - not available in old logs
+                'payload': {'legacy_notes': old_log['notes']} if old_log['notes'] else None,  # New field
+                'timestamp': datetime.fromisoformat(old_log['timestamp']) if old_log['timestamp'] else now,
+                'ip_address': None,  # New field - not available
+                'user_agent': None  # New field - not available
+            })
             
         except Exception as e:
             print(f"   ❌ Failed to migrate audit log: {e}")
     
-    new_session.commit()
+    # Insert all rows in one statement batch; committed with the whole migration
+    new_session.bulk_insert_mappings(AuditLog, rows)
+    new_session.flush()
+    
+    migrated_count = len(rows)
     print(f"✅ Audit logs migration complete: {migrated_count} migrated")
     return migrated_count
 
@@ -187,12 +254,15 @@ def main():
         # Step 3: Connect to databases
         print("🔄 Connecting to databases...")
         old_conn = connect_old_database(old_db_path)
-        new_session = SessionLocal()
+        new_conn = engine.connect()
+        new_session = Session(bind=new_conn)
         
         try:
-            # Step 4: Migrate data
-            asset_count = migrate_assets(old_conn, new_session)
-            audit_count = migrate_audit_logs(old_conn, new_session)
+            # Step 4: Migrate data in a single transaction
+            with bulk_load_mode(new_conn):
+                asset_count = migrate_assets(old_conn, new_session)
+                audit_count = migrate_audit_logs(old_conn, new_session)
+                new_session.commit()
             
             # Step 5: Verify migration
             results = verify_migration(new_session)
@@ -214,6 +284,7 @@ def main():
         finally:
             old_conn.close()
             new_session.close()
+            new_conn.close()
             
     except Exception as e:
         print(f"❌ Migration failed: {e}")
@@ -1,13 +1,14 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, JSON, Float, Boolean
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, DateTime, Text, Float, Boolean, Index, DDL, event
 from sqlalchemy.sql import func
 from .database import Base
-import uuid
-from datetime import datetime
+from .db_types import ORJSON
+from .uuidv7 import uuidv7
 
 class Asset(Base):
     __tablename__ = "assets"
     
-    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = Column(String, primary_key=True, default=uuidv7)
     asset_tag = Column(String, unique=True, index=True, nullable=False)
     name = Column(String, nullable=True)
     item_type = Column(String, nullable=False)
@@ -16,37 +17,99 @@ class Asset(Base):
     status = Column(String, default="Active")  # Active, Missing, Out of Service
     condition = Column(String, default="Good")  # Excellent, Good, Fair, Poor, Needs Repair
     weight = Column(String, nullable=True)
-    last_seen = Column(DateTime, default=datetime.utcnow)
-    created_at = Column(DateTime, server_default=func.now())
-    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+    # Timestamps are filled in client-side so the ORM already holds them after
+    # a commit; server defaults remain for rows inserted outside the ORM
+    last_seen = Column(DateTime, default=datetime.utcnow, server_default=func.now())
+    created_at = Column(DateTime, default=datetime.utcnow, server_default=func.now())
+    updated_at = Column(DateTime, default=datetime.utcnow, server_default=func.now(), onupdate=datetime.utcnow)
     notes = Column(Text, nullable=True)
-    metadata = Column(JSON, nullable=True)
+    metadata = Column(ORJSON, nullable=True)
+    
+    __table_args__ = (
+        # Covers tag lookups that only need existence, id or list columns
+        Index("ix_assets_tag_cover", "asset_tag", "id", "status", "location", "updated_at"),
+        # Keyset pagination order
+        Index("ix_assets_created_at_id", "created_at", "id"),
+        # Filter and GROUP BY columns; status also carries the list order so
+        # status-filtered pages are read in order without a sort
+        Index("ix_assets_status_created_at_id", "status", "created_at", "id"),
+        Index("ix_assets_condition", "condition"),
+        Index("ix_assets_item_type", "item_type"),
+        Index("ix_assets_location", "location"),
+    )
+
+# SQLite trigram full-text index over the searchable asset columns. It is an
+# external-content table: rows live in assets and triggers keep it in sync
+ASSET_SEARCH_COLUMNS = "asset_tag, name, description, location"
+ASSET_SEARCH_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS assets_fts USING fts5("
+    f"{ASSET_SEARCH_COLUMNS}, content='assets', content_rowid='rowid', tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS assets_fts_ai AFTER INSERT ON assets BEGIN "
+    f"INSERT INTO assets_fts(rowid, {ASSET_SEARCH_COLUMNS}) "
+    "VALUES (new.rowid, new.asset_tag, new.name, new.description, new.location); END",
+    "CREATE TRIGGER IF NOT EXISTS assets_fts_ad AFTER DELETE ON assets BEGIN "
+    f"INSERT INTO assets_fts(assets_fts, rowid, {ASSET_SEARCH_COLUMNS}) "
+    "VALUES ('delete', old.rowid, old.asset_tag, old.name, old.description, old.location); END",
+    f"CREATE TRIGGER IF NOT EXISTS assets_fts_au AFTER UPDATE OF {ASSET_SEARCH_COLUMNS} ON assets BEGIN "
+    f"INSERT INTO assets_fts(assets_fts, rowid, {ASSET_SEARCH_COLUMNS}) "
+    "VALUES ('delete', old.rowid, old.asset_tag, old.name, old.description, old.location); "
+    f"INSERT INTO assets_fts(rowid, {ASSET_SEARCH_COLUMNS}) "
+    "VALUES (new.rowid, new.asset_tag, new.name, new.description, new.location); END",
+)
+
+for statement in ASSET_SEARCH_DDL:
+    event.listen(Asset.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
 
 class AnalysisHistory(Base):
     __tablename__ = "analysis_history"
     
-    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = Column(String, primary_key=True, default=uuidv7)
     asset_tag = Column(String, nullable=True)  # Can be null if no asset found
     image_path = Column(String, nullable=False)
     original_filename = Column(String, nullable=True)
-    result = Column(JSON, nullable=True)
+    content_hash = Column(String, nullable=True)  # SHA-256 of the uploaded image
+    result = Column(ORJSON, nullable=True)
     status = Column(String, default="pending")  # pending, processing, completed, failed
     error_message = Column(Text, nullable=True)
     confidence_score = Column(Float, nullable=True)
-    created_at = Column(DateTime, server_default=func.now())
+    created_at = Column(DateTime, default=datetime.utcnow, server_default=func.now())
     completed_at = Column(DateTime, nullable=True)
     processing_time = Column(Float, nullable=True)  # seconds
+    
+    __table_args__ = (
+        # Keyset pagination order
+        Index("ix_analysis_history_created_at_id", "created_at", "id"),
+        # Lookup of earlier results for identical uploads
+        Index("ix_analysis_history_content_hash", "content_hash"),
+    )
+
+# SQLite stores server-default timestamps as 'YYYY-MM-DD HH:MM:SS', while
+# the ORM writes 'YYYY-MM-DD HH:MM:SS.ffffff'. Keyset pagination compares
+# created_at as text, so rows inserted outside the ORM are padded to the ORM
+# format; otherwise a whole-second value sorts below its own cursor
+KEYSET_TABLES = ("assets", "analysis_history")
+CREATED_AT_FORMAT_DDL = {
+    table_name: (
+        f"CREATE TRIGGER IF NOT EXISTS {table_name}_created_at_format AFTER INSERT ON {table_name} "
+        "WHEN length(new.created_at) = 19 BEGIN "
+        f"UPDATE {table_name} SET created_at = new.created_at || '.000000' WHERE rowid = new.rowid; END"
+    )
+    for table_name in KEYSET_TABLES
+}
+
+for table_name, statement in CREATED_AT_FORMAT_DDL.items():
+    event.listen(Base.metadata.tables[table_name], "after_create", DDL(statement).execute_if(dialect="sqlite"))
 
 class AuditLog(Base):
     __tablename__ = "audit_logs"
     
-    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = Column(String, primary_key=True, default=uuidv7)
     action = Column(String, nullable=False)  # CREATE, UPDATE, DELETE, ANALYZE, etc.
     resource_type = Column(String, nullable=False)  # asset, analysis, etc.
     resource_id = Column(String, nullable=True)
     actor = Column(String, default="api_user")  # Could be user ID in future
     endpoint = Column(String, nullable=True)
-    payload = Column(JSON, nullable=True)
-    timestamp = Column(DateTime, server_default=func.now())
+    payload = Column(ORJSON, nullable=True)
+    timestamp = Column(DateTime, default=datetime.utcnow, server_default=func.now())
     ip_address = Column(String, nullable=True)
     user_agent = Column(String, nullable=True)
\ No newline at end of file
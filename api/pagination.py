@@ -0,0 +1,38 @@
+import base64
+import binascii
+from datetime import datetime
+from typing import Optional, Tuple
+from sqlalchemy import and_, or_
+
+def encode_cursor(created_at: datetime, row_id: str) -> str:
+    """Encode the sort key of the last row on a page as an opaque cursor"""
+    return base64.urlsafe_b64encode(f"{created_at.isoformat()}|{row_id}".encode()).decode()
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """Decode a cursor back to (created_at, row ID); raises ValueError if malformed"""
+    try:
+        raw = base64.b64decode(cursor.encode(), altchars=b"-_", validate=True).decode()
+        created_at, row_id = raw.split("|", 1)
+        return datetime.fromisoformat(created_at), row_id
+    except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {e}")
+
+def keyset_after(model, cursor: str):
+    """Filter for rows after the cursor position in (created_at DESC, id DESC) order.
+
+    The cursor carries the whole sort key, so paging continues correctly
+    even if the cursor row itself has been deleted in the meantime. On SQLite
+    this relies on created_at being stored in one text format (see
+    CREATED_AT_FORMAT_DDL in models).
+    """
+    created_at, row_id = decode_cursor(cursor)
+    return or_(
+        model.created_at < created_at,
+        and_(model.created_at == created_at, model.id < row_id)
+    )
+
+def next_cursor(items: list, limit: int) -> Optional[str]:
+    """Cursor for the following page, or None when this page is the last"""
+    if len(items) < limit:
+        return None
+    return encode_cursor(items[-1].created_at, items[-1].id)
@@ -1,17 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, BackgroundTasks, Request, Query
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, BackgroundTasks, Request, Query, Response
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from typing import Optional, List
-from ..database import get_db
+import os
+from ..database import get_db, SessionLocal
 from ..schemas import AnalysisJobResponse, AnalysisOut
-from ..services.analysis_service import AnalysisService
+from ..services.analysis_service import AnalysisService, get_analysis_service
 from ..services.audit_service import AuditService
 from ..auth import require_auth
 from ..config import settings
 
 router = APIRouter(prefix="/api", tags=["Analysis"])
 
-# Initialize analysis service
-analysis_service = AnalysisService()
+# Upload limit read once instead of per request
+_MAX_FILE_SIZE = settings.max_file_size
+
+# Accepted image extensions; checked before the client-supplied content type
+ALLOWED_EXTENSIONS = frozenset({".jpg", ".jpeg", ".png", ".webp", ".gif"})
+_GENERIC_CONTENT_TYPES = frozenset({"application/octet-stream"})
 
 @router.post("/analyze", response_model=AnalysisJobResponse, status_code=202)
 async def analyze_image(
@@ -19,7 +25,9 @@ async def analyze_image(
     request: Request,
     file: UploadFile = File(..., description="Image file to analyze"),
     asset_tag: Optional[str] = Form(None, description="Optional asset tag to associate"),
+    high_detail: bool = Query(False, description="Analyze at high detail for small asset tag text"),
     db: Session = Depends(get_db),
+    analysis_service: AnalysisService = Depends(get_analysis_service),
     auth: dict = Depends(require_auth)
 ):
     """
@@ -27,64 +35,92 @@ async def analyze_image(
     Returns job ID immediately and processes analysis in background.
     """
     
-    # Validate file type
-    if not file.content_type or not file.content_type.startswith("image/"):
+    too_large = HTTPException(
+        status_code=400, 
+        detail=f"File too large. Maximum size: {_MAX_FILE_SIZE / 1024 / 1024:.1f}MB"
+    )
+    
+    # Validate file type (some clients send images as application/octet-stream)
+    file_extension = os.path.splitext(file.filename or "")[1].lower()
+    content_type = file.content_type or ""
+    if file_extension not in ALLOWED_EXTENSIONS or not (
+        content_type.startswith("image/") or content_type in _GENERIC_CONTENT_TYPES
+    ):
         raise HTTPException(status_code=400, detail="File must be an image")
     
-    # Validate file size
-    if file.size and file.size > settings.max_file_size:
-        raise HTTPException(
-            status_code=400, 
-            detail=f"File too large. Maximum size: {settings.max_file_size / 1024 / 1024:.1f}MB"
-        )
+    # Validate declared file size
+    if file.size and file.size > _MAX_FILE_SIZE:
+        raise too_large
+    
+    # Stream the upload to disk, stopping as soon as the limit is exceeded
+    saved = await analysis_service.save_upload(file, _MAX_FILE_SIZE)
+    if saved is None:
+        raise too_large
+    job_id, file_path, content_hash = saved
     
     try:
-        # Create analysis job
-        analysis = analysis_service.create_analysis_job(db, file, asset_tag)
+        # Create analysis job and its audit event; both are only added to the
+        # session here and written by a single commit
+        analysis = analysis_service.create_analysis_job(
+            db, job_id, file_path, content_hash, file.filename, asset_tag, commit=False
+        )
+        job_status = analysis.status
         
-        # Log audit event
         AuditService.log_action(
             db=db,
             action="ANALYZE_REQUEST",
             resource_type="analysis",
-            resource_id=analysis.id,
+            resource_id=job_id,
             endpoint=str(request.url),
             payload={
                 "filename": file.filename,
                 "asset_tag": asset_tag,
                 "content_type": file.content_type
             },
-            ip_address=request.client.host if request.client else None
+            ip_address=request.client.host if request.client else None,
+            commit=False
         )
         
+        # Commit is blocking
+        await run_in_threadpool(db.commit)
+        
         # Start background processing
         background_tasks.add_task(
             process_analysis_background,
-            db_session_factory=lambda: next(get_db()),
-            analysis_id=analysis.id
+            analysis_service=analysis_service,
+            analysis_id=job_id,
+            detail="high" if high_detail else "low",
+            # Identical images reuse an earlier result unless more detail is asked for
+            reuse_previous=not high_detail
         )
         
         return AnalysisJobResponse(
-            job_id=analysis.id,
-            status=analysis.status,
+            job_id=job_id,
+            status=job_status,
             message="Analysis job created successfully. Check status using the job ID."
         )
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to create analysis job: {str(e)}")
 
-async def process_analysis_background(db_session_factory, analysis_id: str):
-    """Background task to process analysis"""
-    db = db_session_factory()
+async def process_analysis_background(
+    analysis_service: AnalysisService,
+    analysis_id: str,
+    detail: str = "low",
+    reuse_previous: bool = False
+):
+    """Background task to process analysis on the event loop"""
+    db = SessionLocal()
     try:
-        analysis_service.process_analysis(db, analysis_id)
+        await analysis_service.process_analysis(db, analysis_id, detail, reuse_previous)
     finally:
         db.close()
 
 @router.get("/analyze/{job_id}", response_model=AnalysisOut)
-async def get_analysis_result(
+def get_analysis_result(
     job_id: str,
     db: Session = Depends(get_db),
+    analysis_service: AnalysisService = Depends(get_analysis_service),
     auth: dict = Depends(require_auth)
 ):
     """Get analysis result by job ID"""
@@ -96,32 +132,44 @@ async def get_analysis_result(
     return analysis
 
 @router.get("/analysis/history", response_model=List[AnalysisOut])
-async def get_analysis_history(
+def get_analysis_history(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=100),
     status: Optional[str] = Query(None),
     asset_tag: Optional[str] = Query(None),
+    cursor: Optional[str] = Query(None, description="Cursor from X-Next-Cursor for the next page"),
     db: Session = Depends(get_db),
+    analysis_service: AnalysisService = Depends(get_analysis_service),
     auth: dict = Depends(require_auth)
 ):
     """Get paginated analysis history with optional filtering"""
     
-    result = analysis_service.get_analysis_history(
-        db=db,
-        skip=skip,
-        limit=limit,
-        status=status,
-        asset_tag=asset_tag
-    )
+    try:
+        result = analysis_service.get_analysis_history(
+            db=db,
+            skip=skip,
+            limit=limit,
+            status=status,
+            asset_tag=asset_tag,
+            cursor=cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if result["next_cursor"]:
+        response.headers["X-Next-Cursor"] = result["next_cursor"]
     
     return result["items"]
 
 @router.post("/analysis/reprocess/{job_id}", response_model=AnalysisJobResponse)
-async def reprocess_analysis(
+def reprocess_analysis(
     job_id: str,
     background_tasks: BackgroundTasks,
     request: Request,
+    high_detail: bool = Query(False, description="Analyze at high detail for small asset tag text"),
     db: Session = Depends(get_db),
+    analysis_service: AnalysisService = Depends(get_analysis_service),
     auth: dict = Depends(require_auth)
 ):
     """Reprocess a failed or completed analysis"""
@@ -136,23 +184,25 @@ async def reprocess_analysis(
     analysis.result = None
     analysis.completed_at = None
     analysis.processing_time = None
-    db.commit()
     
-    # Log audit event
+    # Log audit event in the same transaction as the reset
     AuditService.log_action(
         db=db,
         action="ANALYZE_REPROCESS",
         resource_type="analysis",
         resource_id=analysis.id,
         endpoint=str(request.url),
-        ip_address=request.client.host if request.client else None
+        ip_address=request.client.host if request.client else None,
+        commit=False
     )
+    db.commit()
     
     # Start background processing
     background_tasks.add_task(
         process_analysis_background,
-        db_session_factory=lambda: next(get_db()),
-        analysis_id=analysis.id
+        analysis_service=analysis_service,
+        analysis_id=analysis.id,
+        detail="high" if high_detail else "low"
     )
     
     return AnalysisJobResponse(
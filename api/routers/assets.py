@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
 from typing import Optional, List
 from ..database import get_db
@@ -10,7 +10,7 @@ from ..auth import require_auth
 router = APIRouter(prefix="/api/assets", tags=["Assets"])
 
 @router.post("/", response_model=AssetOut, status_code=201)
-async def create_asset(
+def create_asset(
     asset_data: AssetCreate,
     request: Request,
     db: Session = Depends(get_db),
@@ -19,8 +19,7 @@ async def create_asset(
     """Create a new asset"""
     
     # Check if asset tag already exists
-    existing = AssetService.get_asset_by_tag(db, asset_data.asset_tag)
-    if existing:
+    if AssetService.asset_exists(db, asset_data.asset_tag):
         raise HTTPException(
             status_code=400,
             detail=f"Asset with tag '{asset_data.asset_tag}' already exists"
@@ -28,26 +27,29 @@ async def create_asset(
     
     try:
         # Create asset
-        asset = AssetService.create_asset(db, asset_data)
+        asset = AssetService.create_asset(db, asset_data, commit=False)
         
-        # Log audit event
+        # Log audit event in the same transaction
         AuditService.log_action(
             db=db,
             action="CREATE",
             resource_type="asset",
             resource_id=asset.id,
             endpoint=str(request.url),
-            payload=asset_data.dict(),
-            ip_address=request.client.host if request.client else None
+            payload=asset_data,
+            ip_address=request.client.host if request.client else None,
+            commit=False
         )
         
+        db.commit()
         return asset
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to create asset: {str(e)}")
 
 @router.get("/", response_model=List[AssetOut])
-async def get_assets(
+def get_assets(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=100),
     status: Optional[str] = Query(None),
@@ -55,26 +57,34 @@ async def get_assets(
     item_type: Optional[str] = Query(None),
     location: Optional[str] = Query(None),
     search: Optional[str] = Query(None),
+    cursor: Optional[str] = Query(None, description="Cursor from X-Next-Cursor for the next page"),
     db: Session = Depends(get_db),
     auth: dict = Depends(require_auth)
 ):
     """Get paginated list of assets with optional filtering"""
     
-    result = AssetService.get_assets(
-        db=db,
-        skip=skip,
-        limit=limit,
-        status=status,
-        condition=condition,
-        item_type=item_type,
-        location=location,
-        search=search
-    )
+    try:
+        result = AssetService.get_assets(
+            db=db,
+            skip=skip,
+            limit=limit,
+            status=status,
+            condition=condition,
+            item_type=item_type,
+            location=location,
+            search=search,
+            cursor=cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if result["next_cursor"]:
+        response.headers["X-Next-Cursor"] = result["next_cursor"]
     
     return result["items"]
 
 @router.get("/{asset_tag}", response_model=AssetOut)
-async def get_asset(
+def get_asset(
     asset_tag: str,
     db: Session = Depends(get_db),
     auth: dict = Depends(require_auth)
@@ -88,7 +98,7 @@ async def get_asset(
     return asset
 
 @router.put("/{asset_tag}", response_model=AssetOut)
-async def update_asset(
+def update_asset(
     asset_tag: str,
     asset_update: AssetUpdate,
     request: Request,
@@ -97,33 +107,35 @@ async def update_asset(
 ):
     """Update an existing asset"""
     
-    # Check if asset exists
-    existing = AssetService.get_asset_by_tag(db, asset_tag)
-    if not existing:
-        raise HTTPException(status_code=404, detail="Asset not found")
-    
     try:
-        # Update asset
-        updated_asset = AssetService.update_asset(db, asset_tag, asset_update)
+        # Update asset (None if the tag does not exist)
+        updated_asset = AssetService.update_asset(db, asset_tag, asset_update, commit=False)
         
-        # Log audit event
-        AuditService.log_action(
-            db=db,
-            action="UPDATE",
-            resource_type="asset",
-            resource_id=updated_asset.id,
-            endpoint=str(request.url),
-            payload=asset_update.dict(exclude_unset=True),
-            ip_address=request.client.host if request.client else None
-        )
-        
-        return updated_asset
+        if updated_asset:
+            # Log audit event in the same transaction
+            AuditService.log_action(
+                db=db,
+                action="UPDATE",
+                resource_type="asset",
+                resource_id=updated_asset.id,
+                endpoint=str(request.url),
+                payload=asset_update.model_dump(exclude_unset=True),
+                ip_address=request.client.host if request.client else None,
+                commit=False
+            )
+            
+            db.commit()
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to update asset: {str(e)}")
+    
+    if not updated_asset:
+        raise HTTPException(status_code=404, detail="Asset not found")
+    
+    return updated_asset
 
 @router.delete("/{asset_tag}", status_code=204)
-async def delete_asset(
+def delete_asset(
     asset_tag: str,
     request: Request,
     db: Session = Depends(get_db),
@@ -131,28 +143,25 @@ async def delete_asset(
 ):
     """Delete an asset"""
     
-    # Check if asset exists
-    existing = AssetService.get_asset_by_tag(db, asset_tag)
-    if not existing:
-        raise HTTPException(status_code=404, detail="Asset not found")
-    
     try:
-        # Delete asset
-        success = AssetService.delete_asset(db, asset_tag)
-        if not success:
-            raise HTTPException(status_code=500, detail="Failed to delete asset")
+        # Delete asset; None means the tag does not exist
+        asset_id = AssetService.delete_asset(db, asset_tag, commit=False)
+        if not asset_id:
+            raise HTTPException(status_code=404, detail="Asset not found")
         
-        # Log audit event
+        # Log audit event in the same transaction
         AuditService.log_action(
             db=db,
             action="DELETE",
             resource_type="asset",
-            resource_id=existing.id,
+            resource_id=asset_id,
             endpoint=str(request.url),
             payload={"asset_tag": asset_tag},
-            ip_address=request.client.host if request.client else None
+            ip_address=request.client.host if request.client else None,
+            commit=False
         )
         
+        db.commit()
         return None
         
     except HTTPException:
@@ -161,20 +170,20 @@ async def delete_asset(
         raise HTTPException(status_code=500, detail=f"Failed to delete asset: {str(e)}")
 
 @router.patch("/{asset_tag}/location")
-async def update_asset_location(
+def update_asset_location(
     asset_tag: str,
-    location: str = Query(..., description="New location"),
     request: Request,
+    location: str = Query(..., description="New location"),
     db: Session = Depends(get_db),
     auth: dict = Depends(require_auth)
 ):
     """Update asset location (convenience endpoint)"""
     
-    asset = AssetService.update_asset_location(db, asset_tag, location)
+    asset = AssetService.update_asset_location(db, asset_tag, location, commit=False)
     if not asset:
         raise HTTPException(status_code=404, detail="Asset not found")
     
-    # Log audit event
+    # Log audit event in the same transaction
     AuditService.log_action(
         db=db,
         action="LOCATION_UPDATE",
@@ -182,7 +191,9 @@ async def update_asset_location(
         resource_id=asset.id,
         endpoint=str(request.url),
         payload={"asset_tag": asset_tag, "new_location": location},
-        ip_address=request.client.host if request.client else None
+        ip_address=request.client.host if request.client else None,
+        commit=False
     )
     
+    db.commit()
     return {"message": "Location updated successfully", "asset": asset}
\ No newline at end of file
@@ -1,9 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import Iterable, Iterator, List, Optional
 import csv
 import io
 from datetime import datetime
+from ..cache import report_cache
 from ..database import get_db
 from ..schemas import AssetStatistics, AuditLogOut, AssetOut
 from ..services.asset_service import AssetService
@@ -12,22 +16,92 @@ from ..auth import require_auth
 
 router = APIRouter(prefix="/api/reports", tags=["Reports"])
 
+# Seconds a cached dashboard may be served; asset changes clear it sooner
+DASHBOARD_CACHE_TTL = 60
+
+# List endpoints validate and serialize in one pass through these adapters
+# rather than through FastAPI's response_model handling
+_AUDIT_LOG_LIST = TypeAdapter(List[AuditLogOut])
+_ASSET_LIST = TypeAdapter(List[AssetOut])
+
+def _json_list(adapter: TypeAdapter, items: list) -> Response:
+    """Serialize ORM rows straight to a JSON response body"""
+    models = adapter.validate_python(items, from_attributes=True)
+    return Response(content=adapter.dump_json(models), media_type="application/json")
+
+_CSV_HEADERS = [
+    "Asset Tag", "Name", "Type", "Description", "Location", 
+    "Status", "Condition", "Weight", "Last Seen", 
+    "Created At", "Updated At", "Notes"
+]
+
+# Positions of Last Seen, Created At and Updated At in an export row
+_CSV_DATETIME_COLUMNS = slice(8, 11)
+
+def _format_row(row: tuple) -> list:
+    """Render an export row's timestamps as ISO 8601"""
+    row = list(row)
+    row[_CSV_DATETIME_COLUMNS] = [
+        value.isoformat() if value else "" for value in row[_CSV_DATETIME_COLUMNS]
+    ]
+    return row
+
+def _csv_chunks(batches: Iterable[List[tuple]]) -> Iterator[str]:
+    """Yield the CSV export one chunk per database batch"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(_CSV_HEADERS)
+    
+    for rows in batches:
+        writer.writerows(map(_format_row, rows))
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+    
+    # Header only, when nothing matched
+    if buffer.tell():
+        yield buffer.getvalue()
+
+def _build_dashboard(db: Session) -> dict:
+    """Assemble the dashboard payload as plain JSON-ready data for caching"""
+    # Get statistics (usually already warm in the cache)
+    stats = AssetService.get_cached_statistics(db)
+    
+    # Attention counts come from the breakdowns rather than loading the rows
+    missing_count = stats["by_status"].get("Missing", 0)
+    repair_count = stats["by_condition"].get("Needs Repair", 0)
+    
+    # Get recent assets (last 10)
+    recent_assets = AssetService.get_assets(db, skip=0, limit=10)
+    
+    return jsonable_encoder({
+        "statistics": stats,
+        "missing_assets": missing_count,
+        "repair_assets": repair_count,
+        "recent_assets": recent_assets["items"],
+        "alerts": {
+            "missing_count": missing_count,
+            "repair_count": repair_count,
+            "has_alerts": missing_count > 0 or repair_count > 0
+        }
+    })
+
 @router.get("/statistics", response_model=AssetStatistics)
-async def get_asset_statistics(
+def get_asset_statistics(
     db: Session = Depends(get_db),
     auth: dict = Depends(require_auth)
 ):
     """Get comprehensive asset statistics"""
     
     try:
-        stats = AssetService.get_statistics(db)
+        stats = AssetService.get_cached_statistics(db)
         return AssetStatistics(**stats)
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get statistics: {str(e)}")
 
-@router.get("/audit-logs", response_model=List[AuditLogOut])
-async def get_audit_logs(
+@router.get("/audit-logs", response_model=None, responses={200: {"model": List[AuditLogOut]}})
+def get_audit_logs(
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=100),
     resource_type: Optional[str] = Query(None),
@@ -46,13 +120,13 @@ async def get_audit_logs(
             action=action
         )
         
-        return result["items"]
+        return _json_list(_AUDIT_LOG_LIST, result["items"])
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get audit logs: {str(e)}")
 
 @router.get("/export")
-async def export_assets_csv(
+def export_assets_csv(
     status: Optional[str] = Query(None),
     condition: Optional[str] = Query(None),
     item_type: Optional[str] = Query(None),
@@ -60,61 +134,24 @@ async def export_assets_csv(
     db: Session = Depends(get_db),
     auth: dict = Depends(require_auth)
 ):
-    """Export assets to CSV file"""
+    """Export assets to CSV file, streamed in batches"""
     
     try:
-        # Get filtered assets
-        result = AssetService.get_assets(
+        # Rows are fetched in batches as the response is sent
+        batches = AssetService.iter_export_batches(
             db=db,
-            skip=0,
-            limit=10000,  # Large limit for export
             status=status,
             condition=condition,
             item_type=item_type,
             location=location
         )
         
-        assets = result["items"]
-        
-        # Create CSV in memory
-        output = io.StringIO()
-        writer = csv.writer(output)
-        
-        # Write headers
-        headers = [
-            "Asset Tag", "Name", "Type", "Description", "Location", 
-            "Status", "Condition", "Weight", "Last Seen", 
-            "Created At", "Updated At", "Notes"
-        ]
-        writer.writerow(headers)
-        
-        # Write data rows
-        for asset in assets:
-            writer.writerow([
-                asset.asset_tag,
-                asset.name or "",
-                asset.item_type,
-                asset.description or "",
-                asset.location,
-                asset.status,
-                asset.condition,
-                asset.weight or "",
-                asset.last_seen.isoformat() if asset.last_seen else "",
-                asset.created_at.isoformat() if asset.created_at else "",
-                asset.updated_at.isoformat() if asset.updated_at else "",
-                asset.notes or ""
-            ])
-        
-        # Prepare response
-        csv_content = output.getvalue()
-        output.close()
-        
         # Generate filename with timestamp
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = f"gym_assets_{timestamp}.csv"
         
-        return Response(
-            content=csv_content,
+        return StreamingResponse(
+            _csv_chunks(batches),
             media_type="text/csv",
             headers={"Content-Disposition": f"attachment; filename={filename}"}
         )
@@ -122,62 +159,43 @@ async def export_assets_csv(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to export assets: {str(e)}")
 
-@router.get("/missing", response_model=List[AssetOut])
-async def get_missing_assets(
+@router.get("/missing", response_model=None, responses={200: {"model": List[AssetOut]}})
+def get_missing_assets(
     db: Session = Depends(get_db),
     auth: dict = Depends(require_auth)
 ):
     """Get assets flagged as missing"""
     
     try:
-        attention_assets = AssetService.get_assets_needing_attention(db)
-        return attention_assets["missing"]
+        return _json_list(_ASSET_LIST, AssetService.get_missing_assets(db))
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get missing assets: {str(e)}")
 
-@router.get("/repair", response_model=List[AssetOut])
-async def get_assets_needing_repair(
+@router.get("/repair", response_model=None, responses={200: {"model": List[AssetOut]}})
+def get_assets_needing_repair(
     db: Session = Depends(get_db),
     auth: dict = Depends(require_auth)
 ):
     """Get assets needing repair"""
     
     try:
-        attention_assets = AssetService.get_assets_needing_attention(db)
-        return attention_assets["needs_repair"]
+        return _json_list(_ASSET_LIST, AssetService.get_assets_needing_repair(db))
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get repair assets: {str(e)}")
 
 @router.get("/dashboard")
-async def get_dashboard_data(
+def get_dashboard_data(
     db: Session = Depends(get_db),
     auth: dict = Depends(require_auth)
 ):
     """Get comprehensive dashboard data"""
     
     try:
-        # Get statistics
-        stats = AssetService.get_statistics(db)
-        
-        # Get assets needing attention
-        attention = AssetService.get_assets_needing_attention(db)
-        
-        # Get recent assets (last 10)
-        recent_assets = AssetService.get_assets(db, skip=0, limit=10)
-        
-        return {
-            "statistics": stats,
-            "missing_assets": len(attention["missing"]),
-            "repair_assets": len(attention["needs_repair"]),
-            "recent_assets": recent_assets["items"],
-            "alerts": {
-                "missing_count": len(attention["missing"]),
-                "repair_count": len(attention["needs_repair"]),
-                "has_alerts": len(attention["missing"]) > 0 or len(attention["needs_repair"]) > 0
-            }
-        }
+        return report_cache.get_or_set(
+            "dashboard", DASHBOARD_CACHE_TTL, lambda: _build_dashboard(db)
+        )
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get dashboard data: {str(e)}")
\ No newline at end of file
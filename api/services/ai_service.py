@@ -1,29 +1,65 @@
-import os
-import json
 import base64
+import orjson
+import threading
 from typing import Dict, Any, Optional
 from PIL import Image
 from io import BytesIO
-from openai import OpenAI
-import re
+from fastapi.concurrency import run_in_threadpool
+from openai import AsyncOpenAI
+from functools import cached_property
 from ..config import settings
 
+_local = threading.local()
+
+# Image budget per OpenAI detail level: (max pixels, max side, JPEG quality).
+# Low detail is processed as a single 512px tile, so anything larger is
+# wasted upload; high detail keeps enough resolution for small tag text.
+DETAIL_SETTINGS = {
+    "low": (512 * 512, 512, 70),
+    "high": (300000, None, 80),
+}
+
+def _encode_buffer() -> BytesIO:
+    """Thread-local BytesIO reused for JPEG encoding instead of allocating one per image"""
+    buffer = getattr(_local, "buffer", None)
+    if buffer is None:
+        buffer = _local.buffer = BytesIO()
+    buffer.seek(0)
+    buffer.truncate(0)
+    return buffer
+
 class AIService:
-    def __init__(self):
+    @cached_property
+    def client(self) -> AsyncOpenAI:
+        """Async OpenAI client, created once and reused for every analysis"""
         if not settings.openai_api_key:
             raise ValueError("OpenAI API key not found. Set OPENAI_API_KEY environment variable.")
-        self.client = OpenAI(api_key=settings.openai_api_key)
+        return AsyncOpenAI(api_key=settings.openai_api_key)
     
-    def compress_image_efficiently(self, image: Image.Image, max_pixels: int = 400000, quality: int = 75) -> Optional[Image.Image]:
+    def warmup(self):
+        """Build the OpenAI client ahead of the first analysis if a key is configured"""
+        if settings.openai_api_key:
+            self.client
+    
+    def compress_image_efficiently(
+        self,
+        image: Image.Image,
+        max_pixels: int = 400000,
+        quality: int = 75,
+        max_side: Optional[int] = None
+    ) -> Optional[Image.Image]:
         """Compress image for OpenAI while maintaining quality for detection"""
         try:
             width, height = image.size
             total_pixels = width * height
 
-            if total_pixels > max_pixels:
-                scale_factor = (max_pixels / total_pixels) ** 0.5
-                new_width = int(width * scale_factor)
-                new_height = int(height * scale_factor)
+            scale_factor = min(1.0, (max_pixels / total_pixels) ** 0.5)
+            if max_side:
+                scale_factor = min(scale_factor, max_side / max(width, height))
+
+            if scale_factor < 1.0:
+                new_width = max(1, int(width * scale_factor))
+                new_height = max(1, int(height * scale_factor))
                 image = image.resize((new_width, new_height), Image.Resampling.LANCZOS)
 
             # Convert to RGB if needed
@@ -44,33 +80,55 @@ class AIService:
         except Exception as e:
             raise ValueError(f"Image compression error: {e}")
 
-    def image_to_base64(self, image: Image.Image) -> str:
-        """Convert image to base64 with memory management"""
+    def image_to_base64(self, image: Image.Image, detail: str = "low") -> str:
+        """Convert image to base64 sized for the given OpenAI detail level"""
         try:
-            compressed = self.compress_image_efficiently(image, max_pixels=300000, quality=80)
+            max_pixels, max_side, quality = DETAIL_SETTINGS[detail]
+            compressed = self.compress_image_efficiently(
+                image, max_pixels=max_pixels, quality=quality, max_side=max_side
+            )
             if not compressed:
                 raise ValueError("Failed to compress image")
 
-            buffer = BytesIO()
-            compressed.save(buffer, format="JPEG", quality=80, optimize=True)
-            img_bytes = buffer.getvalue()
-            base64_str = base64.b64encode(img_bytes).decode('utf-8')
-            buffer.close()
+            buffer = _encode_buffer()
+            compressed.save(buffer, format="JPEG", quality=quality, optimize=True)
             
-            return base64_str
+            # Encode straight from the buffer's memory without a bytes copy;
+            # the view must be released before the buffer is reused
+            with buffer.getbuffer() as view:
+                return base64.b64encode(view).decode('ascii')
 
         except Exception as e:
             raise ValueError(f"Base64 conversion error: {e}")
 
-    def analyze_gym_equipment(self, image_path: str, asset_tag: Optional[str] = None) -> Dict[str, Any]:
-        """Use GPT-4o to detect both asset tags and equipment in gym images"""
+    def load_image_base64(self, image_path: str, detail: str = "low") -> str:
+        """Open an image file and return it compressed and base64 encoded (blocking)"""
+        # Let the open fail instead of checking existence first (one syscall, no race)
         try:
-            # Load and process image
-            if not os.path.exists(image_path):
-                raise FileNotFoundError(f"Image file not found: {image_path}")
-            
             image = Image.open(image_path)
-            base64_image = self.image_to_base64(image)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Image file not found: {image_path}")
+        
+        try:
+            return self.image_to_base64(image, detail)
+        finally:
+            image.close()
+
+    async def analyze_gym_equipment(
+        self,
+        image_path: str,
+        asset_tag: Optional[str] = None,
+        detail: str = "low"
+    ) -> Dict[str, Any]:
+        """Use GPT-4o to detect both asset tags and equipment in gym images.
+        
+        ``detail="high"`` sends a larger image tiled at high detail, for
+        asset tags too small to read at the default low detail.
+        """
+        try:
+            # Load and process image; file access, decoding, resizing and
+            # JPEG encoding all happen in the threadpool, off the event loop
+            base64_image = await run_in_threadpool(self.load_image_base64, image_path, detail)
             
             # Check size limit (OpenAI has ~20MB limit)
             if len(base64_image) > 15 * 1024 * 1024:  # 15MB safety margin
@@ -111,7 +169,7 @@ For asset tags, look for any text/codes that could be used for tracking - sticke
 For equipment, be specific about weights and types."""
 
             # Use GPT-4o model
-            response = self.client.chat.completions.create(
+            response = await self.client.chat.completions.create(
                 model=settings.openai_model,
                 messages=[
                     {
@@ -122,39 +180,36 @@ For equipment, be specific about weights and types."""
                                 "type": "image_url",
                                 "image_url": {
                                     "url": f"data:image/jpeg;base64,{base64_image}",
-                                    "detail": "high"
+                                    "detail": detail
                                 }
                             }
                         ]
                     }
                 ],
                 max_tokens=1500,
-                temperature=0.1
+                temperature=0.1,
+                response_format={"type": "json_object"}  # Guarantees a bare JSON object
             )
 
             content = response.choices[0].message.content
 
             # Parse JSON response
             try:
-                json_match = re.search(r'\{.*\}', content, re.DOTALL)
-                if json_match:
-                    result = json.loads(json_match.group())
-                    
-                    # Calculate confidence score based on results
-                    confidence_score = self._calculate_confidence_score(result)
-                    result["confidence_score"] = confidence_score
-                    
-                    return result
-                else:
-                    return {"error": "No valid JSON in response", "raw_response": content}
-            except json.JSONDecodeError:
+                result = orjson.loads(content or "")
+            except orjson.JSONDecodeError:
                 return {"error": "Failed to parse JSON", "raw_response": content}
+            
+            if not isinstance(result, dict):
+                return {"error": "No valid JSON in response", "raw_response": content}
+            
+            # Calculate confidence score based on results
+            confidence_score = self._calculate_confidence_score(result)
+            result["confidence_score"] = confidence_score
+            
+            return result
 
         except Exception as e:
             return {"error": f"Analysis failed: {str(e)}"}
-        finally:
-            if 'image' in locals():
-                image.close()
 
     def _calculate_confidence_score(self, result: Dict[str, Any]) -> float:
         """Calculate overall confidence score based on analysis results"""
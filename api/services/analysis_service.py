@@ -1,76 +1,170 @@
+import hashlib
 import os
-import uuid
-import shutil
 from datetime import datetime
-from typing import Optional
+from typing import Optional, Tuple
+from sqlalchemy import select
 from sqlalchemy.orm import Session
-from fastapi import UploadFile
+from fastapi import Request, UploadFile
+from fastapi.concurrency import run_in_threadpool
 from ..models import AnalysisHistory, Asset
 from ..config import settings
+from ..uuidv7 import uuidv7
+from ..pagination import keyset_after, next_cursor
 from .ai_service import AIService
 from .asset_service import AssetService
 
+# Uploads are read and written this many bytes at a time
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
 class AnalysisService:
     def __init__(self):
+        # Created once per app; the upload directory is made in the lifespan
         self.ai_service = AIService()
-        
-        # Ensure upload directory exists
-        os.makedirs(settings.upload_dir, exist_ok=True)
     
-    def create_analysis_job(
-        self,
-        db: Session,
-        file: UploadFile,
-        asset_tag: Optional[str] = None
-    ) -> AnalysisHistory:
-        """Create a new analysis job and save the uploaded file"""
+    def warmup(self):
+        """Prepare expensive resources before the first request"""
+        self.ai_service.warmup()
+    
+    async def save_upload(self, file: UploadFile, max_size: int) -> Optional[Tuple[str, str, str]]:
+        """Stream an upload to disk in chunks, hashing it on the way.
+        
+        Returns (job_id, file_path, sha256 hex digest), or None if the upload
+        is larger than max_size, in which case the partial file is removed.
+        """
         
         # Generate unique filename
-        job_id = str(uuid.uuid4())
+        job_id = uuidv7()
         file_extension = os.path.splitext(file.filename or "image.jpg")[1]
         filename = f"{job_id}{file_extension}"
         file_path = os.path.join(settings.upload_dir, filename)
         
-        # Save uploaded file
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        hasher = hashlib.sha256()
+        total_size = 0
+        buffer = await run_in_threadpool(open, file_path, "wb")
+        try:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                total_size += len(chunk)
+                if total_size > max_size:
+                    break
+                hasher.update(chunk)
+                await run_in_threadpool(buffer.write, chunk)
+        except BaseException:
+            buffer.close()
+            os.remove(file_path)
+            raise
+        
+        await run_in_threadpool(buffer.close)
+        if total_size > max_size:
+            await run_in_threadpool(os.remove, file_path)
+            return None
+        
+        return job_id, file_path, hasher.hexdigest()
+    
+    def create_analysis_job(
+        self,
+        db: Session,
+        job_id: str,
+        file_path: str,
+        content_hash: Optional[str] = None,
+        original_filename: Optional[str] = None,
+        asset_tag: Optional[str] = None,
+        commit: bool = True
+    ) -> AnalysisHistory:
+        """Create a new analysis job for an image saved by save_upload.
+        
+        With commit=False the record is only added to the session, for the
+        caller to commit together with its own writes.
+        """
         
         # Create analysis record
         analysis = AnalysisHistory(
             id=job_id,
             asset_tag=asset_tag.upper() if asset_tag else None,
             image_path=file_path,
-            original_filename=file.filename,
+            original_filename=original_filename,
+            content_hash=content_hash,
             status="pending"
         )
         
         db.add(analysis)
-        db.commit()
-        db.refresh(analysis)
+        if commit:
+            db.commit()
         
         return analysis
     
-    def process_analysis(self, db: Session, analysis_id: str) -> Optional[AnalysisHistory]:
-        """Process the analysis using AI service"""
+    async def process_analysis(
+        self,
+        db: Session,
+        analysis_id: str,
+        detail: str = "low",
+        reuse_previous: bool = False
+    ) -> Optional[AnalysisHistory]:
+        """Process the analysis using AI service.
         
-        # Get analysis record
-        analysis = db.query(AnalysisHistory).filter(AnalysisHistory.id == analysis_id).first()
+        Database work runs in the threadpool; only the OpenAI request is
+        awaited on the event loop, so concurrent jobs overlap without
+        holding a worker thread each. With reuse_previous, an identical
+        image that was already analyzed is answered from its stored result.
+        """
+        analysis = await run_in_threadpool(self._start_processing, db, analysis_id)
         if not analysis:
             return None
         
         start_time = datetime.utcnow()
         
-        try:
-            # Update status to processing
-            analysis.status = "processing"
-            db.commit()
-            
-            # Perform AI analysis
-            result = self.ai_service.analyze_gym_equipment(
-                analysis.image_path, 
-                analysis.asset_tag
+        result = None
+        if reuse_previous:
+            result = await run_in_threadpool(self._find_previous_result, db, analysis)
+        
+        # Perform AI analysis
+        if result is None:
+            try:
+                result = await self.ai_service.analyze_gym_equipment(
+                    analysis.image_path, 
+                    analysis.asset_tag,
+                    detail
+                )
+            except Exception as e:
+                result = {"error": str(e)}
+        
+        return await run_in_threadpool(self._finish_processing, db, analysis, result, start_time)
+    
+    def _start_processing(self, db: Session, analysis_id: str) -> Optional[AnalysisHistory]:
+        """Load the analysis record and mark it as processing"""
+        analysis = db.query(AnalysisHistory).filter(AnalysisHistory.id == analysis_id).first()
+        if not analysis:
+            return None
+        
+        analysis.status = "processing"
+        db.commit()
+        return analysis
+    
+    def _find_previous_result(self, db: Session, analysis: AnalysisHistory) -> Optional[dict]:
+        """Result of the latest completed analysis of the same image content"""
+        if not analysis.content_hash:
+            return None
+        
+        stmt = (
+            select(AnalysisHistory.result)
+            .where(
+                AnalysisHistory.content_hash == analysis.content_hash,
+                AnalysisHistory.status == "completed",
+                AnalysisHistory.id != analysis.id
             )
-            
+            .order_by(AnalysisHistory.created_at.desc())
+            .limit(1)
+        )
+        return db.scalar(stmt)
+    
+    def _finish_processing(
+        self,
+        db: Session,
+        analysis: AnalysisHistory,
+        result: dict,
+        start_time: datetime
+    ) -> AnalysisHistory:
+        """Store the AI result on the analysis record"""
+        try:
             # Calculate processing time
             processing_time = (datetime.utcnow() - start_time).total_seconds()
             
@@ -87,7 +181,6 @@ class AnalysisService:
             analysis.processing_time = processing_time
             
             db.commit()
-            db.refresh(analysis)
             
             # Try to auto-update asset if asset_tag provided and found
             if analysis.asset_tag and analysis.status == "completed":
@@ -97,13 +190,13 @@ class AnalysisService:
             
         except Exception as e:
             # Update analysis record with error
+            db.rollback()
             analysis.status = "failed"
             analysis.error_message = str(e)
             analysis.completed_at = datetime.utcnow()
             analysis.processing_time = (datetime.utcnow() - start_time).total_seconds()
             
             db.commit()
-            db.refresh(analysis)
             
             return analysis
     
@@ -113,13 +206,7 @@ class AnalysisService:
             if not analysis.asset_tag or not analysis.result:
                 return
             
-            # Check if asset exists
-            asset = AssetService.get_asset_by_tag(db, analysis.asset_tag)
-            if not asset:
-                return
-            
-            # Update last_seen timestamp
-            asset.last_seen = datetime.utcnow()
+            condition = weight = description = None
             
             # If equipment was detected, update asset information
             equipment_list = analysis.result.get("equipment", [])
@@ -127,33 +214,29 @@ class AnalysisService:
                 # Use first detected equipment for updates
                 equipment = equipment_list[0]
                 
-                # Update condition if detected and different
-                detected_condition = equipment.get("condition", "").lower()
+                # Update condition if detected
+                detected_condition = (equipment.get("condition") or "").lower()
                 condition_mapping = {
                     "excellent": "Excellent",
                     "good": "Good", 
                     "fair": "Fair",
                     "poor": "Poor"
                 }
+                condition = condition_mapping.get(detected_condition)
                 
-                if detected_condition in condition_mapping:
-                    new_condition = condition_mapping[detected_condition]
-                    if asset.condition != new_condition:
-                        asset.condition = new_condition
-                
-                # Update weight if not set and detected
-                if not asset.weight and equipment.get("weight", "unknown") != "unknown":
-                    asset.weight = equipment.get("weight")
-                
-                # Update description if empty and detected
-                if not asset.description and equipment.get("description"):
-                    asset.description = equipment.get("description")
+                # Weight and description only fill in empty fields
+                if equipment.get("weight", "unknown") != "unknown":
+                    weight = equipment.get("weight")
+                description = equipment.get("description")
             
-            asset.updated_at = datetime.utcnow()
-            db.commit()
+            # Single UPDATE; a missing asset simply matches no rows
+            AssetService.apply_analysis_update(
+                db, analysis.asset_tag, condition, weight, description
+            )
             
         except Exception as e:
             # Don't fail the analysis if auto-update fails
+            db.rollback()
             print(f"Auto-update failed for asset {analysis.asset_tag}: {e}")
     
     def get_analysis_by_id(self, db: Session, analysis_id: str) -> Optional[AnalysisHistory]:
@@ -166,10 +249,16 @@ class AnalysisService:
         skip: int = 0,
         limit: int = 100,
         status: Optional[str] = None,
-        asset_tag: Optional[str] = None
+        asset_tag: Optional[str] = None,
+        cursor: Optional[str] = None,
+        include_total: bool = False
     ):
-        """Get paginated analysis history"""
-        query = db.query(AnalysisHistory).order_by(AnalysisHistory.created_at.desc())
+        """Get paginated analysis history, newest first (keyset via ``cursor``).
+        
+        ``total`` is only counted when ``include_total`` is set, and never on
+        cursor pages.
+        """
+        query = db.query(AnalysisHistory)
         
         if status:
             query = query.filter(AnalysisHistory.status == status)
@@ -177,10 +266,19 @@ class AnalysisService:
         if asset_tag:
             query = query.filter(AnalysisHistory.asset_tag == asset_tag.upper())
         
-        total = query.count()
-        items = query.offset(skip).limit(limit).all()
+        page = query.order_by(AnalysisHistory.created_at.desc(), AnalysisHistory.id.desc())
+        if cursor:
+            page = page.filter(keyset_after(AnalysisHistory, cursor))
+        elif skip:
+            page = page.offset(skip)
+        items = page.limit(limit).all()
+        
+        total = None
+        if include_total and not cursor:
+            # A short first page already holds every match
+            total = len(items) if not skip and len(items) < limit else query.count()
         
-        return {"items": items, "total": total}
+        return {"items": items, "total": total, "next_cursor": next_cursor(items, limit)}
     
     def cleanup_old_files(self, db: Session, days: int = 30):
         """Clean up old analysis files (optional maintenance task)"""
@@ -205,4 +303,8 @@ class AnalysisService:
         if deleted_count > 0:
             db.commit()
         
-        return deleted_count
\ No newline at end of file
+        return deleted_count
+
+def get_analysis_service(request: Request) -> AnalysisService:
+    """Dependency returning the shared service created in the app lifespan"""
+    return request.app.state.analysis_service
\ No newline at end of file
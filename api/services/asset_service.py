@@ -1,23 +1,57 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import func, or_
+from sqlalchemy.orm import Session, raiseload
+from sqlalchemy import bindparam, column, delete, event, func, literal, literal_column, or_, select, table, union_all, update
+from fastapi.concurrency import run_in_threadpool
+from ..cache import report_cache
+from ..database import SessionLocal
 from ..models import Asset
+from ..pagination import keyset_after, next_cursor
 from ..schemas import AssetCreate, AssetUpdate
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Iterator
 from datetime import datetime
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Cached statistics are kept warm by StatisticsRefresher; the TTL only
+# matters if the refresher is not running
+STATISTICS_CACHE_KEY = "statistics"
+STATISTICS_CACHE_TTL = 300
+
+# Trigram search index kept in sync with assets (SQLite only); the trigram
+# tokenizer needs at least three characters to match
+ASSET_SEARCH_TABLE = table("assets_fts", column("rowid"), column("assets_fts"))
+ASSET_SEARCH_MIN_LENGTH = 3
+
+def mark_assets_changed(db: Session):
+    """Flag the session so cached reports are dropped once it commits"""
+    db.info["assets_changed"] = True
+
+@event.listens_for(Session, "after_commit")
+def _clear_report_cache(session: Session):
+    if session.info.pop("assets_changed", False):
+        report_cache.clear()
+
+@event.listens_for(Session, "after_rollback")
+def _discard_assets_changed(session: Session):
+    session.info.pop("assets_changed", None)
 
 class AssetService:
     @staticmethod
-    def create_asset(db: Session, asset_data: AssetCreate) -> Asset:
-        """Create a new asset"""
-        # Convert Pydantic model to dict
-        asset_dict = asset_data.dict()
+    def create_asset(db: Session, asset_data: AssetCreate, commit: bool = True) -> Asset:
+        """Create a new asset; with commit=False the caller commits the transaction"""
+        # Only fields the client sent; column defaults fill in the rest
+        asset_dict = asset_data.model_dump(exclude_unset=True)
         asset_dict['asset_tag'] = asset_dict['asset_tag'].upper()
-        asset_dict['last_seen'] = datetime.utcnow()
         
         db_asset = Asset(**asset_dict)
         db.add(db_asset)
+        mark_assets_changed(db)
+        if not commit:
+            db.flush()  # Assign the ID without committing
+            return db_asset
+        
         db.commit()
-        db.refresh(db_asset)
         return db_asset
     
     @staticmethod
@@ -25,6 +59,12 @@ class AssetService:
         """Get asset by tag"""
         return db.query(Asset).filter(Asset.asset_tag == asset_tag.upper()).first()
     
+    @staticmethod
+    def asset_exists(db: Session, asset_tag: str) -> bool:
+        """Check whether an asset tag is registered without loading the row"""
+        stmt = select(1).where(Asset.asset_tag == asset_tag.upper()).limit(1)
+        return db.scalar(stmt) is not None
+    
     @staticmethod
     def get_asset_by_id(db: Session, asset_id: str) -> Optional[Asset]:
         """Get asset by ID"""
@@ -39,9 +79,70 @@ class AssetService:
         condition: Optional[str] = None,
         item_type: Optional[str] = None,
         location: Optional[str] = None,
-        search: Optional[str] = None
+        search: Optional[str] = None,
+        cursor: Optional[str] = None,
+        include_total: bool = False
     ) -> Dict[str, Any]:
-        """Get paginated list of assets with optional filtering"""
+        """Get paginated list of assets with optional filtering.
+        
+        Results are ordered newest first. Pass the returned ``next_cursor``
+        as ``cursor`` to fetch the following page without an OFFSET scan.
+        ``total`` is only counted when ``include_total`` is set, and never
+        on cursor pages, since counting reads every matching row.
+        """
+        query = AssetService._filtered_query(
+            db, status, condition, item_type, location, search
+        ).options(raiseload("*"))  # Serialization must never trigger per-row lazy loads
+        
+        # Apply ordering and pagination; the page stops reading at LIMIT
+        # along the (created_at, id) index
+        page = query.order_by(Asset.created_at.desc(), Asset.id.desc())
+        if cursor:
+            page = page.filter(keyset_after(Asset, cursor))
+        elif skip:
+            page = page.offset(skip)
+        items = page.limit(limit).all()
+        
+        total = None
+        if include_total and not cursor:
+            # A short first page already holds every match
+            total = len(items) if not skip and len(items) < limit else query.count()
+        
+        return {"items": items, "total": total, "next_cursor": next_cursor(items, limit)}
+    
+    # Column order of the CSV export
+    EXPORT_COLUMNS = (
+        Asset.asset_tag, Asset.name, Asset.item_type, Asset.description,
+        Asset.location, Asset.status, Asset.condition, Asset.weight,
+        Asset.last_seen, Asset.created_at, Asset.updated_at, Asset.notes
+    )
+    
+    @staticmethod
+    def iter_export_batches(
+        db: Session,
+        status: Optional[str] = None,
+        condition: Optional[str] = None,
+        item_type: Optional[str] = None,
+        location: Optional[str] = None,
+        batch_size: int = 500
+    ) -> Iterator[List[tuple]]:
+        """Iterate over matching assets as batches of plain column tuples (no ORM objects)"""
+        query = AssetService._filtered_query(db, status, condition, item_type, location)
+        query = query.with_entities(*AssetService.EXPORT_COLUMNS)
+        query = query.order_by(Asset.created_at.desc(), Asset.id.desc())
+        result = db.execute(query.statement, execution_options={"yield_per": batch_size})
+        return result.partitions()
+    
+    @staticmethod
+    def _filtered_query(
+        db: Session,
+        status: Optional[str] = None,
+        condition: Optional[str] = None,
+        item_type: Optional[str] = None,
+        location: Optional[str] = None,
+        search: Optional[str] = None
+    ):
+        """Build an asset query with the common list filters applied"""
         query = db.query(Asset)
         
         # Apply filters
@@ -57,8 +158,14 @@ class AssetService:
         if location:
             query = query.filter(Asset.location.ilike(f"%{location}%"))
         
-        if search:
-            search_term = f"%{search}%"
+        if search and len(search) >= ASSET_SEARCH_MIN_LENGTH and db.get_bind().dialect.name == "sqlite":
+            # Case-insensitive substring match, answered from the trigram index
+            phrase = '"' + search.replace('"', '""') + '"'
+            matches = select(ASSET_SEARCH_TABLE.c.rowid).where(ASSET_SEARCH_TABLE.c.assets_fts.match(phrase))
+            query = query.filter(literal_column("assets.rowid").in_(matches))
+        elif search:
+            # One bound parameter shared by all four predicates
+            search_term = bindparam("search_term", f"%{search}%")
             query = query.filter(
                 or_(
                     Asset.asset_tag.ilike(search_term),
@@ -68,94 +175,178 @@ class AssetService:
                 )
             )
         
-        # Get total count
-        total = query.count()
-        
-        # Apply pagination and ordering
-        items = query.order_by(Asset.updated_at.desc()).offset(skip).limit(limit).all()
-        
-        return {"items": items, "total": total}
+        return query
     
     @staticmethod
-    def update_asset(db: Session, asset_tag: str, asset_update: AssetUpdate) -> Optional[Asset]:
-        """Update an existing asset"""
-        db_asset = AssetService.get_asset_by_tag(db, asset_tag)
-        if not db_asset:
-            return None
+    def update_asset(db: Session, asset_tag: str, asset_update: AssetUpdate, commit: bool = True) -> Optional[Asset]:
+        """Update an existing asset; returns None if the tag does not exist"""
+        # Update only provided fields; updated_at is bumped by the column's onupdate
+        update_data = asset_update.model_dump(exclude_unset=True)
         
-        # Update only provided fields
-        update_data = asset_update.dict(exclude_unset=True)
-        for field, value in update_data.items():
-            setattr(db_asset, field, value)
+        # Single UPDATE ... RETURNING doubles as the existence check
+        stmt = (
+            update(Asset)
+            .where(Asset.asset_tag == asset_tag.upper())
+            .values(**update_data)
+            .returning(Asset)
+        )
+        db_asset = db.scalars(stmt).first()
+        if db_asset:
+            mark_assets_changed(db)
+        if not db_asset or not commit:
+            return db_asset
         
-        db_asset.updated_at = datetime.utcnow()
         db.commit()
-        db.refresh(db_asset)
         return db_asset
     
     @staticmethod
-    def update_asset_location(db: Session, asset_tag: str, location: str) -> Optional[Asset]:
-        """Update asset location and last_seen timestamp"""
-        db_asset = AssetService.get_asset_by_tag(db, asset_tag)
+    def update_asset_location(db: Session, asset_tag: str, location: str, commit: bool = True) -> Optional[Asset]:
+        """Update asset location and last_seen timestamp; returns None if the tag does not exist"""
+        # Single UPDATE ... RETURNING, with last_seen and updated_at from the
+        # same client-side clock as the column defaults
+        now = datetime.utcnow()
+        stmt = (
+            update(Asset)
+            .where(Asset.asset_tag == asset_tag.upper())
+            .values(location=location, last_seen=now, updated_at=now)
+            .returning(Asset)
+        )
+        db_asset = db.scalars(stmt).first()
         if not db_asset:
             return None
         
-        db_asset.location = location
-        db_asset.last_seen = datetime.utcnow()
-        db_asset.updated_at = datetime.utcnow()
-        
-        db.commit()
-        db.refresh(db_asset)
+        mark_assets_changed(db)
+        if commit:
+            db.commit()
         return db_asset
     
     @staticmethod
-    def delete_asset(db: Session, asset_tag: str) -> bool:
-        """Delete an asset"""
-        db_asset = AssetService.get_asset_by_tag(db, asset_tag)
-        if not db_asset:
-            return False
+    def apply_analysis_update(
+        db: Session,
+        asset_tag: str,
+        condition: Optional[str] = None,
+        weight: Optional[str] = None,
+        description: Optional[str] = None,
+        commit: bool = True
+    ) -> bool:
+        """Record an analysis sighting in one UPDATE; returns False if the tag does not exist.
         
-        db.delete(db_asset)
-        db.commit()
-        return True
+        last_seen is always bumped and condition overwritten when given;
+        weight and description only fill in values that are still empty.
+        """
+        now = datetime.utcnow()
+        values = {"last_seen": now, "updated_at": now}
+        if condition:
+            values["condition"] = condition
+        if weight:
+            values["weight"] = func.coalesce(func.nullif(Asset.weight, ""), weight)
+        if description:
+            values["description"] = func.coalesce(func.nullif(Asset.description, ""), description)
+        
+        stmt = (
+            update(Asset)
+            .where(Asset.asset_tag == asset_tag.upper())
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        updated = db.execute(stmt).rowcount > 0
+        if updated:
+            mark_assets_changed(db)
+        if commit:
+            db.commit()
+        return updated
     
     @staticmethod
-    def get_statistics(db: Session) -> Dict[str, Any]:
-        """Get asset statistics"""
-        total_assets = db.query(Asset).count()
-        
-        # Status breakdown
-        status_stats = db.query(Asset.status, func.count(Asset.id)).group_by(Asset.status).all()
-        status_dict = {status: count for status, count in status_stats}
+    def delete_asset(db: Session, asset_tag: str, commit: bool = True) -> Optional[str]:
+        """Delete an asset; returns its ID, or None if the tag does not exist"""
+        # Single DELETE ... RETURNING doubles as the existence check
+        stmt = (
+            delete(Asset)
+            .where(Asset.asset_tag == asset_tag.upper())
+            .returning(Asset.id)
+            .execution_options(synchronize_session=False)
+        )
+        asset_id = db.scalar(stmt)
+        if not asset_id:
+            return None
         
-        # Condition breakdown
-        condition_stats = db.query(Asset.condition, func.count(Asset.id)).group_by(Asset.condition).all()
-        condition_dict = {condition: count for condition, count in condition_stats}
+        mark_assets_changed(db)
+        if commit:
+            db.commit()
+        return asset_id
+    
+    # Breakdown key in the statistics payload -> grouped column
+    STATISTICS_DIMENSIONS = {
+        "by_status": Asset.status,
+        "by_condition": Asset.condition,
+        "by_type": Asset.item_type,
+        "by_location": Asset.location,
+    }
+    
+    @staticmethod
+    def get_statistics(db: Session) -> Dict[str, Any]:
+        """Get asset statistics.
         
-        # Type breakdown
-        type_stats = db.query(Asset.item_type, func.count(Asset.id)).group_by(Asset.item_type).all()
-        type_dict = {item_type: count for item_type, count in type_stats}
+        All four breakdowns come back from a single UNION ALL query, one
+        row per (breakdown, value); the total is the sum of any breakdown.
+        """
+        stmt = union_all(*[
+            select(literal(key).label("dimension"), column.label("value"), func.count().label("count"))
+            .group_by(column)
+            for key, column in AssetService.STATISTICS_DIMENSIONS.items()
+        ])
         
-        # Location breakdown
-        location_stats = db.query(Asset.location, func.count(Asset.id)).group_by(Asset.location).all()
-        location_dict = {location: count for location, count in location_stats}
+        breakdowns = {key: {} for key in AssetService.STATISTICS_DIMENSIONS}
+        for dimension, value, count in db.execute(stmt):
+            breakdowns[dimension][value] = count
         
         return {
-            "total_assets": total_assets,
-            "by_status": status_dict,
-            "by_condition": condition_dict,
-            "by_type": type_dict,
-            "by_location": location_dict,
+            "total_assets": sum(breakdowns["by_status"].values()),
+            **breakdowns,
             "last_updated": datetime.utcnow()
         }
     
     @staticmethod
-    def get_assets_needing_attention(db: Session) -> Dict[str, List[Asset]]:
-        """Get assets that need attention (missing or need repair)"""
-        missing_assets = db.query(Asset).filter(Asset.status == "Missing").all()
-        repair_assets = db.query(Asset).filter(Asset.condition == "Needs Repair").all()
-        
-        return {
-            "missing": missing_assets,
-            "needs_repair": repair_assets
-        }
\ No newline at end of file
+    def get_cached_statistics(db: Session) -> Dict[str, Any]:
+        """Get asset statistics from the report cache, computing them if stale"""
+        return report_cache.get_or_set(
+            STATISTICS_CACHE_KEY, STATISTICS_CACHE_TTL, lambda: AssetService.get_statistics(db)
+        )
+    
+    @staticmethod
+    def get_missing_assets(db: Session) -> List[Asset]:
+        """Get assets flagged as missing"""
+        return db.query(Asset).options(raiseload("*")).filter(Asset.status == "Missing").all()
+    
+    @staticmethod
+    def get_assets_needing_repair(db: Session) -> List[Asset]:
+        """Get assets whose condition is Needs Repair"""
+        return db.query(Asset).options(raiseload("*")).filter(Asset.condition == "Needs Repair").all()
+
+class StatisticsRefresher:
+    """Recomputes the cached statistics on a timer so requests rarely have to"""
+
+    def __init__(self, session_factory=SessionLocal, interval: float = 60.0):
+        self.session_factory = session_factory
+        self.interval = interval
+
+    def refresh(self):
+        """Recompute statistics into the report cache"""
+        db = self.session_factory()
+        try:
+            report_cache.refresh(
+                STATISTICS_CACHE_KEY, STATISTICS_CACHE_TTL, lambda: AssetService.get_statistics(db)
+            )
+        except Exception as e:
+            logger.error(f"Failed to refresh asset statistics: {e}")
+        finally:
+            db.close()
+
+    async def run(self):
+        """Refresh immediately, then every interval seconds"""
+        while True:
+            await run_in_threadpool(self.refresh)
+            await asyncio.sleep(self.interval)
+
+# Shared refresher started in the app lifespan
+statistics_refresher = StatisticsRefresher()
\ No newline at end of file
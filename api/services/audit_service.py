@@ -1,6 +1,7 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, raiseload
+from pydantic import BaseModel
 from ..models import AuditLog
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Union
 import json
 
 class AuditService:
@@ -12,22 +13,21 @@ class AuditService:
         resource_id: Optional[str] = None,
         actor: str = "api_user",
         endpoint: Optional[str] = None,
-        payload: Optional[Dict[str, Any]] = None,
+        payload: Optional[Union[Dict[str, Any], BaseModel]] = None,
         ip_address: Optional[str] = None,
-        user_agent: Optional[str] = None
+        user_agent: Optional[str] = None,
+        commit: bool = True
     ) -> AuditLog:
-        """Log an audit event"""
+        """Log an audit event.
         
-        # Serialize payload if provided
-        serialized_payload = None
-        if payload:
-            try:
-                # Convert to dict if it's a Pydantic model
-                if hasattr(payload, 'dict'):
-                    payload = payload.dict()
-                serialized_payload = payload
-            except Exception:
-                serialized_payload = {"error": "Could not serialize payload"}
+        With commit=False the row is only added to ``db``, so it is
+        committed together with the caller's own transaction.
+        """
+        
+        # Pydantic models are dumped to JSON-ready values, leaving out unset (None) fields
+        serialized_payload = payload or None
+        if isinstance(payload, BaseModel):
+            serialized_payload = payload.model_dump(mode="json", exclude_none=True)
         
         audit_log = AuditLog(
             action=action,
@@ -41,8 +41,8 @@ class AuditService:
         )
         
         db.add(audit_log)
-        db.commit()
-        db.refresh(audit_log)
+        if commit:
+            db.commit()
         
         return audit_log
     
@@ -55,7 +55,7 @@ class AuditService:
         action: Optional[str] = None
     ):
         """Get paginated audit logs with optional filtering"""
-        query = db.query(AuditLog).order_by(AuditLog.timestamp.desc())
+        query = db.query(AuditLog).options(raiseload("*")).order_by(AuditLog.timestamp.desc())
         
         if resource_type:
             query = query.filter(AuditLog.resource_type == resource_type)
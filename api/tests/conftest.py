@@ -1,11 +1,13 @@
 import pytest
 import os
 import tempfile
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 from fastapi.testclient import TestClient
-from ..database import Base, get_db
+from ..database import Base, get_db, set_sqlite_pragmas
+from ..cache import report_cache
 from ..main import app
+from ..services.asset_service import statistics_refresher
 from ..config import settings
 
 # Test database
@@ -16,15 +18,19 @@ def test_engine():
     """Create test database engine"""
     engine = create_engine(
         TEST_DATABASE_URL,
-        connect_args={"check_same_thread": False}
+        connect_args={"check_same_thread": False},
+        query_cache_size=1200
     )
+    event.listen(engine, "connect", set_sqlite_pragmas)
     Base.metadata.create_all(bind=engine)
     yield engine
-    # Cleanup
-    try:
-        os.remove("./test_gym_assets.db")
-    except FileNotFoundError:
-        pass
+    # Cleanup, including the WAL sidecar files
+    engine.dispose()
+    for suffix in ("", "-wal", "-shm"):
+        try:
+            os.remove(f"./test_gym_assets.db{suffix}")
+        except FileNotFoundError:
+            pass
 
 @pytest.fixture(scope="function")
 def test_db(test_engine):
@@ -32,6 +38,7 @@ def test_db(test_engine):
     TestingSessionLocal = sessionmaker(
         autocommit=False, 
         autoflush=False, 
+        expire_on_commit=False,
         bind=test_engine
     )
     
@@ -40,12 +47,31 @@ def test_db(test_engine):
         yield session
     finally:
         session.close()
-        # Clean up tables
-        for table in reversed(Base.metadata.sorted_tables):
-            test_engine.execute(table.delete())
+        # Clean up tables in one transaction (a single commit instead of one per table)
+        with test_engine.begin() as conn:
+            for table in reversed(Base.metadata.sorted_tables):
+                conn.execute(table.delete())
+
+@pytest.fixture(scope="session")
+def app_client(test_engine):
+    """One TestClient, and so one app lifespan, shared by every test"""
+    # Refresh statistics against the test database
+    original_session_factory = statistics_refresher.session_factory
+    test_session_factory = sessionmaker(
+        autocommit=False,
+        autoflush=False,
+        expire_on_commit=False,
+        bind=test_engine
+    )
+    statistics_refresher.session_factory = test_session_factory
+    
+    with TestClient(app) as client:
+        yield client
+    
+    statistics_refresher.session_factory = original_session_factory
 
 @pytest.fixture(scope="function")
-def test_client(test_db):
+def test_client(test_db, app_client):
     """Create test client with test database"""
     def override_get_db():
         try:
@@ -55,19 +81,33 @@ def test_client(test_db):
     
     app.dependency_overrides[get_db] = override_get_db
     
-    with TestClient(app) as client:
-        yield client
+    # Tables are emptied between tests, so cached reports must go too
+    report_cache.clear()
+    
+    yield app_client
     
     app.dependency_overrides.clear()
 
 @pytest.fixture
+def query_counter(test_engine):
+    """Statements sent to the test database; clear() it before the request being measured"""
+    statements = []
+    
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    
+    event.listen(test_engine, "before_cursor_execute", record)
+    yield statements
+    event.remove(test_engine, "before_cursor_execute", record)
+
+@pytest.fixture(scope="session")
 def auth_headers():
-    """Authentication headers for testing"""
+    """Authentication headers for testing; shared, so copy before modifying"""
     return {"X-API-Key": settings.api_key}
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def sample_asset_data():
-    """Sample asset data for testing"""
+    """Sample asset data for testing; shared, so copy before modifying"""
     return {
         "asset_tag": "TEST001",
         "name": "Test Dumbbell",
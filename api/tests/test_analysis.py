@@ -1,18 +1,25 @@
 import pytest
 import tempfile
+import hashlib
 import io
 from PIL import Image
 from fastapi.testclient import TestClient
+from sqlalchemy import text
+from ..models import AnalysisHistory
 
-@pytest.fixture
-def test_image():
-    """Create a test image for analysis"""
+@pytest.fixture(scope="session")
+def test_image_bytes():
+    """Encode the test JPEG once per session"""
     # Create a simple test image
     img = Image.new('RGB', (100, 100), color='red')
     img_bytes = io.BytesIO()
     img.save(img_bytes, format='JPEG')
-    img_bytes.seek(0)
-    return img_bytes
+    return img_bytes.getvalue()
+
+@pytest.fixture
+def test_image(test_image_bytes):
+    """Create a test image for analysis"""
+    return io.BytesIO(test_image_bytes)
 
 def test_analyze_image_endpoint(test_client: TestClient, auth_headers: dict, test_image, temp_upload_dir):
     """Test image analysis endpoint"""
@@ -54,12 +61,31 @@ def test_get_analysis_result(test_client: TestClient, auth_headers: dict, test_i
     data = response.json()
     assert data["id"] == job_id
 
+def test_analyze_stores_content_hash(test_client: TestClient, test_db, auth_headers: dict, test_image, temp_upload_dir):
+    """Test that identical uploads are recorded with the same content hash"""
+    
+    image_bytes = test_image.getvalue()
+    job_ids = []
+    for _ in range(2):
+        files = {"file": ("test_image.jpg", io.BytesIO(image_bytes), "image/jpeg")}
+        response = test_client.post("/api/analyze", files=files, headers=auth_headers)
+        assert response.status_code == 202
+        job_ids.append(response.json()["job_id"])
+    
+    jobs = test_db.query(AnalysisHistory).filter(AnalysisHistory.id.in_(job_ids)).all()
+    assert len(jobs) == 2
+    assert {job.content_hash for job in jobs} == {hashlib.sha256(image_bytes).hexdigest()}
+    
+    # Each upload is still saved under its own job ID
+    with open(jobs[0].image_path, "rb") as saved:
+        assert saved.read() == image_bytes
+
 def test_get_nonexistent_analysis(test_client: TestClient, auth_headers: dict):
     """Test getting nonexistent analysis returns 404"""
     response = test_client.get("/api/analyze/nonexistent-id", headers=auth_headers)
     assert response.status_code == 404
 
-def test_analysis_history(test_client: TestClient, auth_headers: dict, test_image, temp_upload_dir):
+def test_analysis_history(test_client: TestClient, auth_headers: dict, test_image, temp_upload_dir, query_counter: list):
     """Test getting analysis history"""
     
     # Create an analysis job
@@ -67,13 +93,43 @@ def test_analysis_history(test_client: TestClient, auth_headers: dict, test_imag
     test_client.post("/api/analyze", files=files, headers=auth_headers)
     
     # Get analysis history
+    query_counter.clear()
     response = test_client.get("/api/analysis/history", headers=auth_headers)
     
     assert response.status_code == 200
+    assert len(query_counter) <= 1  # Just the page, no count
     data = response.json()
     assert isinstance(data, list)
     assert len(data) >= 1
 
+def test_analysis_history_cursor_whole_second_timestamps(test_client: TestClient, test_db, auth_headers: dict):
+    """Test paging analysis history through rows whose created_at has no fractional seconds"""
+    # Several rows sharing one whole-second timestamp, plus rows stamped by
+    # the server default (SQLite's CURRENT_TIMESTAMP)
+    insert = "INSERT INTO analysis_history (id, image_path, status{}) VALUES (:id, 'legacy.jpg', 'completed'{})"
+    for i in range(3):
+        test_db.execute(
+            text(insert.format(", created_at", ", '2024-01-01 12:00:00'")),
+            {"id": f"legacy-{i}"}
+        )
+    for i in range(3, 5):
+        test_db.execute(text(insert.format("", "")), {"id": f"legacy-{i}"})
+    test_db.commit()
+    
+    seen = []
+    params = {"limit": 2}
+    for _ in range(10):
+        response = test_client.get("/api/analysis/history", params=params, headers=auth_headers)
+        assert response.status_code == 200
+        seen += [analysis["id"] for analysis in response.json()]
+        if "X-Next-Cursor" not in response.headers:
+            break
+        params["cursor"] = response.headers["X-Next-Cursor"]
+    else:
+        pytest.fail(f"Paging did not terminate; saw {seen}")
+    
+    assert sorted(seen) == [f"legacy-{i}" for i in range(5)]
+
 def test_analyze_invalid_file_type(test_client: TestClient, auth_headers: dict):
     """Test analyzing invalid file type returns error"""
     
@@ -90,6 +146,14 @@ def test_analyze_invalid_file_type(test_client: TestClient, auth_headers: dict):
     assert response.status_code == 400
     assert "must be an image" in response.json()["detail"]
 
+def test_analyze_octet_stream_image(test_client: TestClient, auth_headers: dict, test_image, temp_upload_dir):
+    """Test image uploads sent as application/octet-stream are accepted by extension"""
+    
+    files = {"file": ("test_image.jpg", test_image, "application/octet-stream")}
+    response = test_client.post("/api/analyze", files=files, headers=auth_headers)
+    
+    assert response.status_code == 202
+
 def test_analyze_without_auth(test_client: TestClient, test_image):
     """Test analysis endpoint requires authentication"""
     
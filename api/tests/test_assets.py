@@ -1,5 +1,11 @@
 import pytest
+from datetime import datetime
 from fastapi.testclient import TestClient
+from sqlalchemy import text
+from .. import database
+from ..config import settings
+from ..schemas import AssetCreate
+from ..services.asset_service import AssetService
 
 def test_create_asset(test_client: TestClient, auth_headers: dict, sample_asset_data: dict):
     """Test creating a new asset"""
@@ -30,18 +36,152 @@ def test_create_duplicate_asset(test_client: TestClient, auth_headers: dict, sam
     assert response.status_code == 400
     assert "already exists" in response.json()["detail"]
 
-def test_get_assets(test_client: TestClient, auth_headers: dict, sample_asset_data: dict):
+def test_get_assets(test_client: TestClient, auth_headers: dict, sample_asset_data: dict, query_counter: list):
     """Test getting list of assets"""
     # Create an asset first
     test_client.post("/api/assets/", json=sample_asset_data, headers=auth_headers)
     
+    query_counter.clear()
     response = test_client.get("/api/assets/", headers=auth_headers)
     
     assert response.status_code == 200
+    assert len(query_counter) <= 1  # Just the page, no count
     data = response.json()
     assert len(data) == 1
     assert data[0]["asset_tag"] == sample_asset_data["asset_tag"]
 
+def test_get_assets_cursor_pagination(test_client: TestClient, auth_headers: dict, sample_asset_data: dict, query_counter: list):
+    """Test walking the asset list with keyset cursors"""
+    for i in range(3):
+        test_client.post(
+            "/api/assets/",
+            json={**sample_asset_data, "asset_tag": f"PAGE{i:03d}"},
+            headers=auth_headers
+        )
+    
+    response = test_client.get("/api/assets/", params={"limit": 2}, headers=auth_headers)
+    assert response.status_code == 200
+    first_page = [asset["asset_tag"] for asset in response.json()]
+    assert len(first_page) == 2
+    
+    cursor = response.headers["X-Next-Cursor"]
+    query_counter.clear()
+    response = test_client.get("/api/assets/", params={"limit": 2, "cursor": cursor}, headers=auth_headers)
+    assert response.status_code == 200
+    assert len(query_counter) <= 1  # No count on keyset pages
+    second_page = [asset["asset_tag"] for asset in response.json()]
+    assert len(second_page) == 1
+    assert "X-Next-Cursor" not in response.headers
+    
+    assert sorted(first_page + second_page) == ["PAGE000", "PAGE001", "PAGE002"]
+
+def test_get_assets_cursor_after_row_deleted(test_client: TestClient, auth_headers: dict, sample_asset_data: dict):
+    """Test that paging continues when the cursor row is deleted between requests"""
+    for i in range(4):
+        test_client.post(
+            "/api/assets/",
+            json={**sample_asset_data, "asset_tag": f"PAGE{i:03d}"},
+            headers=auth_headers
+        )
+    
+    response = test_client.get("/api/assets/", params={"limit": 2}, headers=auth_headers)
+    first_page = [asset["asset_tag"] for asset in response.json()]
+    cursor = response.headers["X-Next-Cursor"]
+    
+    test_client.delete(f"/api/assets/{first_page[-1]}", headers=auth_headers)
+    
+    response = test_client.get("/api/assets/", params={"limit": 2, "cursor": cursor}, headers=auth_headers)
+    assert response.status_code == 200
+    second_page = [asset["asset_tag"] for asset in response.json()]
+    assert len(second_page) == 2
+    assert sorted(first_page + second_page) == ["PAGE000", "PAGE001", "PAGE002", "PAGE003"]
+
+def test_get_assets_total_on_request(test_db, sample_asset_data: dict):
+    """Test that the asset total is only counted when asked for"""
+    for i in range(3):
+        AssetService.create_asset(test_db, AssetCreate(**{**sample_asset_data, "asset_tag": f"PAGE{i:03d}"}))
+    
+    assert AssetService.get_assets(test_db, limit=2)["total"] is None
+    assert AssetService.get_assets(test_db, limit=2, include_total=True)["total"] == 3
+    assert AssetService.get_assets(test_db, limit=5, include_total=True)["total"] == 3
+    assert AssetService.get_assets(test_db, skip=5, limit=2, include_total=True)["total"] == 3
+    
+    cursor = AssetService.get_assets(test_db, limit=2)["next_cursor"]
+    assert AssetService.get_assets(test_db, limit=2, cursor=cursor, include_total=True)["total"] is None
+
+def insert_raw_assets(db, tags, created_at=None):
+    """Insert assets with plain SQL, as a client outside the ORM would"""
+    columns = "id, asset_tag, item_type, location, status, condition"
+    values = ":tag, :tag, 'Bench', 'Room A', 'Active', 'Good'"
+    if created_at:
+        columns += ", created_at"
+        values += ", :created_at"
+    for tag in tags:
+        db.execute(text(f"INSERT INTO assets ({columns}) VALUES ({values})"), {"tag": tag, "created_at": created_at})
+    db.commit()
+
+def walk_asset_pages(test_client: TestClient, auth_headers: dict, limit: int = 2) -> list:
+    """Follow X-Next-Cursor to the end, failing if paging does not terminate"""
+    seen = []
+    params = {"limit": limit}
+    for _ in range(10):
+        response = test_client.get("/api/assets/", params=params, headers=auth_headers)
+        assert response.status_code == 200
+        seen += [asset["asset_tag"] for asset in response.json()]
+        if "X-Next-Cursor" not in response.headers:
+            return seen
+        params["cursor"] = response.headers["X-Next-Cursor"]
+    pytest.fail(f"Paging did not terminate; saw {seen}")
+
+def test_get_assets_cursor_whole_second_timestamps(test_client: TestClient, test_db, auth_headers: dict):
+    """Test paging through rows whose created_at has no fractional seconds"""
+    # Several rows sharing one whole-second timestamp, plus rows stamped by
+    # the server default (SQLite's CURRENT_TIMESTAMP)
+    insert_raw_assets(test_db, ["LEGACY0", "LEGACY1", "LEGACY2"], created_at="2024-01-01 12:00:00")
+    insert_raw_assets(test_db, ["LEGACY3", "LEGACY4"])
+    
+    seen = walk_asset_pages(test_client, auth_headers)
+    assert sorted(seen) == ["LEGACY0", "LEGACY1", "LEGACY2", "LEGACY3", "LEGACY4"]
+
+def test_create_tables_normalizes_legacy_timestamps(test_client: TestClient, test_db, test_engine, auth_headers: dict, monkeypatch):
+    """Test that rows stored before the created_at format trigger existed are paged correctly"""
+    test_db.execute(text("DROP TRIGGER assets_created_at_format"))
+    insert_raw_assets(test_db, ["LEGACY0", "LEGACY1", "LEGACY2"], created_at="2024-01-01 12:00:00")
+    insert_raw_assets(test_db, ["LEGACY3", "LEGACY4"])
+    
+    monkeypatch.setattr(database, "engine", test_engine)
+    database.create_tables()
+    
+    lengths = test_db.execute(text("SELECT DISTINCT length(created_at) FROM assets")).scalars().all()
+    assert lengths == [26]
+    seen = walk_asset_pages(test_client, auth_headers)
+    assert sorted(seen) == ["LEGACY0", "LEGACY1", "LEGACY2", "LEGACY3", "LEGACY4"]
+
+def test_search_assets(test_client: TestClient, auth_headers: dict, sample_asset_data: dict):
+    """Test substring search over the asset search index"""
+    test_client.post("/api/assets/", json=sample_asset_data, headers=auth_headers)
+    test_client.post(
+        "/api/assets/",
+        json={**sample_asset_data, "asset_tag": "BENCH001", "name": "Flat Bench", "description": None},
+        headers=auth_headers
+    )
+    
+    def search(term):
+        response = test_client.get("/api/assets/", params={"search": term}, headers=auth_headers)
+        assert response.status_code == 200
+        return sorted(asset["asset_tag"] for asset in response.json())
+    
+    assert search("BELL") == ["TEST001"]
+    assert search("bench") == ["BENCH001"]
+    assert search("room a") == ["BENCH001", "TEST001"]
+    assert search("fl") == ["BENCH001"]  # Too short for the index
+    
+    # Edits are picked up by the index
+    test_client.put("/api/assets/BENCH001", json={"name": "Incline"}, headers=auth_headers)
+    assert search("bench") == ["BENCH001"]  # Still in the asset tag
+    assert search("incline") == ["BENCH001"]
+    assert search("flat") == []
+
 def test_get_asset_by_tag(test_client: TestClient, auth_headers: dict, sample_asset_data: dict):
     """Test getting specific asset by tag"""
     # Create an asset first
@@ -77,6 +217,16 @@ def test_update_asset(test_client: TestClient, auth_headers: dict, sample_asset_
     assert data["location"] == "Updated Room B"
     assert data["condition"] == "Good"
 
+def test_update_nonexistent_asset(test_client: TestClient, auth_headers: dict):
+    """Test updating nonexistent asset returns 404"""
+    response = test_client.put(
+        "/api/assets/NONEXISTENT",
+        json={"location": "Nowhere"},
+        headers=auth_headers
+    )
+    
+    assert response.status_code == 404
+
 def test_delete_asset(test_client: TestClient, auth_headers: dict, sample_asset_data: dict):
     """Test deleting an asset"""
     # Create an asset first
@@ -107,6 +257,13 @@ def test_update_asset_location(test_client: TestClient, auth_headers: dict, samp
     assert response.status_code == 200
     data = response.json()
     assert data["asset"]["location"] == new_location
+    
+    # One clock for the whole row: no earlier than creation, and matching updated_at
+    last_seen, created_at, updated_at = (
+        datetime.fromisoformat(data["asset"][key]) for key in ("last_seen", "created_at", "updated_at")
+    )
+    assert last_seen == updated_at
+    assert last_seen >= created_at
 
 def test_unauthorized_access(test_client: TestClient, sample_asset_data: dict):
     """Test that endpoints require authentication"""
@@ -114,4 +271,12 @@ def test_unauthorized_access(test_client: TestClient, sample_asset_data: dict):
     assert response.status_code == 401
     
     response = test_client.post("/api/assets/", json=sample_asset_data)
-    assert response.status_code == 401
\ No newline at end of file
+    assert response.status_code == 401
+
+def test_bearer_token_access(test_client: TestClient):
+    """Test that a valid bearer token is accepted and an invalid one rejected"""
+    response = test_client.get("/api/assets/", headers={"Authorization": f"Bearer {settings.secret_key}"})
+    assert response.status_code == 200
+    
+    response = test_client.get("/api/assets/", headers={"Authorization": "Bearer wrong-token"})
+    assert response.status_code == 401
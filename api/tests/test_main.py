@@ -36,4 +36,26 @@ def test_openapi_docs_accessible(test_client: TestClient):
     assert response.status_code == 200
     
     response = test_client.get("/openapi.json")
-    assert response.status_code == 200
\ No newline at end of file
+    assert response.status_code == 200
+
+def test_cors_headers(test_client: TestClient):
+    """Test CORS headers on browser requests and preflights"""
+    origin = "http://example.com"
+    
+    response = test_client.get("/api/health")
+    assert "access-control-allow-origin" not in response.headers
+    
+    response = test_client.get("/api/health", headers={"Origin": origin})
+    assert response.headers["access-control-allow-origin"] == origin
+    
+    response = test_client.options(
+        "/api/assets/",
+        headers={
+            "Origin": origin,
+            "Access-Control-Request-Method": "POST",
+            "Access-Control-Request-Headers": "X-API-Key"
+        }
+    )
+    assert response.status_code == 204
+    assert response.headers["access-control-allow-origin"] == origin
+    assert response.headers["access-control-allow-headers"] == "X-API-Key"
\ No newline at end of file
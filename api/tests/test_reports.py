@@ -17,15 +17,28 @@ def test_get_statistics(test_client: TestClient, auth_headers: dict, sample_asse
     assert "by_condition" in data
     assert "by_type" in data
 
-def test_get_audit_logs(test_client: TestClient, auth_headers: dict, sample_asset_data: dict):
+def test_statistics_refresh_after_asset_change(test_client: TestClient, auth_headers: dict, sample_asset_data: dict):
+    """Test that cached statistics are dropped when assets change"""
+    
+    response = test_client.get("/api/reports/statistics", headers=auth_headers)
+    assert response.json()["total_assets"] == 0
+    
+    test_client.post("/api/assets/", json=sample_asset_data, headers=auth_headers)
+    
+    response = test_client.get("/api/reports/statistics", headers=auth_headers)
+    assert response.json()["total_assets"] == 1
+
+def test_get_audit_logs(test_client: TestClient, auth_headers: dict, sample_asset_data: dict, query_counter: list):
     """Test getting audit logs"""
     
     # Create an asset to generate audit logs
     test_client.post("/api/assets/", json=sample_asset_data, headers=auth_headers)
     
+    query_counter.clear()
     response = test_client.get("/api/reports/audit-logs", headers=auth_headers)
     
     assert response.status_code == 200
+    assert len(query_counter) <= 2
     data = response.json()
     assert isinstance(data, list)
     assert len(data) >= 1
@@ -48,7 +61,23 @@ def test_export_assets_csv(test_client: TestClient, auth_headers: dict, sample_a
     assert "Asset Tag" in csv_content
     assert sample_asset_data["asset_tag"] in csv_content
 
-def test_get_missing_assets(test_client: TestClient, auth_headers: dict):
+def test_export_assets_csv_gzip(test_client: TestClient, auth_headers: dict, sample_asset_data: dict):
+    """Test that the CSV export is gzip-compressed when the client accepts it"""
+    
+    for i in range(20):
+        asset = dict(sample_asset_data, asset_tag=f"GZIP{i:03d}")
+        test_client.post("/api/assets/", json=asset, headers=auth_headers)
+    
+    response = test_client.get(
+        "/api/reports/export",
+        headers={**auth_headers, "Accept-Encoding": "gzip"}
+    )
+    
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert "GZIP019" in response.text
+
+def test_get_missing_assets(test_client: TestClient, auth_headers: dict, query_counter: list):
     """Test getting missing assets"""
     
     # Create a missing asset
@@ -60,14 +89,16 @@ def test_get_missing_assets(test_client: TestClient, auth_headers: dict):
     }
     test_client.post("/api/assets/", json=missing_asset, headers=auth_headers)
     
+    query_counter.clear()
     response = test_client.get("/api/reports/missing", headers=auth_headers)
     
     assert response.status_code == 200
+    assert len(query_counter) <= 1
     data = response.json()
     assert len(data) >= 1
     assert data[0]["status"] == "Missing"
 
-def test_get_assets_needing_repair(test_client: TestClient, auth_headers: dict):
+def test_get_assets_needing_repair(test_client: TestClient, auth_headers: dict, query_counter: list):
     """Test getting assets needing repair"""
     
     # Create an asset needing repair
@@ -79,22 +110,26 @@ def test_get_assets_needing_repair(test_client: TestClient, auth_headers: dict):
     }
     test_client.post("/api/assets/", json=repair_asset, headers=auth_headers)
     
+    query_counter.clear()
     response = test_client.get("/api/reports/repair", headers=auth_headers)
     
     assert response.status_code == 200
+    assert len(query_counter) <= 1
     data = response.json()
     assert len(data) >= 1
     assert data[0]["condition"] == "Needs Repair"
 
-def test_get_dashboard_data(test_client: TestClient, auth_headers: dict, sample_asset_data: dict):
+def test_get_dashboard_data(test_client: TestClient, auth_headers: dict, sample_asset_data: dict, query_counter: list):
     """Test getting dashboard data"""
     
     # Create test assets
     test_client.post("/api/assets/", json=sample_asset_data, headers=auth_headers)
     
+    query_counter.clear()
     response = test_client.get("/api/reports/dashboard", headers=auth_headers)
     
     assert response.status_code == 200
+    assert len(query_counter) <= 2  # Grouped statistics and recent assets
     data = response.json()
     assert "statistics" in data
     assert "missing_assets" in data
@@ -102,6 +137,25 @@ def test_get_dashboard_data(test_client: TestClient, auth_headers: dict, sample_
     assert "recent_assets" in data
     assert "alerts" in data
 
+def test_dashboard_alert_counts(test_client: TestClient, auth_headers: dict):
+    """Test dashboard alert counts for missing and repair assets"""
+    
+    test_client.post("/api/assets/", json={
+        "asset_tag": "MISSING002",
+        "item_type": "Kettlebell",
+        "location": "Storage",
+        "status": "Missing",
+        "condition": "Needs Repair"
+    }, headers=auth_headers)
+    
+    response = test_client.get("/api/reports/dashboard", headers=auth_headers)
+    
+    assert response.status_code == 200
+    data = response.json()
+    assert data["missing_assets"] == 1
+    assert data["repair_assets"] == 1
+    assert data["alerts"]["has_alerts"] is True
+
 def test_reports_require_auth(test_client: TestClient):
     """Test that report endpoints require authentication"""
     endpoints = [
@@ -0,0 +1,45 @@
+"""
+Time-ordered UUIDv7 generation (RFC 9562).
+
+UUIDv7 puts a 48-bit millisecond timestamp in front of the random bits, so
+newly generated primary keys sort after existing ones and inserts land at
+the end of the index instead of at random positions.
+"""
+
+import os
+import threading
+import time
+import uuid
+
+# Random bytes needed per UUID and how many UUIDs each refill covers
+_RANDOM_BYTES = 10
+_POOL_SIZE = 1024
+
+_local = threading.local()
+
+def _next_random() -> bytes:
+    """Take 10 random bytes from a thread-local pool, refilled 1024 UUIDs at a time"""
+    pool = getattr(_local, "pool", None)
+    offset = getattr(_local, "offset", 0)
+
+    if pool is None or offset >= len(pool):
+        pool = _local.pool = os.urandom(_RANDOM_BYTES * _POOL_SIZE)
+        offset = 0
+
+    _local.offset = offset + _RANDOM_BYTES
+    return pool[offset:offset + _RANDOM_BYTES]
+
+def uuidv7_bytes() -> bytes:
+    """Generate a UUIDv7 as 16 raw bytes"""
+    timestamp_ms = time.time_ns() // 1_000_000
+    value = bytearray(timestamp_ms.to_bytes(6, "big") + _next_random())
+
+    # Set version (7) and RFC 4122 variant bits
+    value[6] = 0x70 | (value[6] & 0x0F)
+    value[8] = 0x80 | (value[8] & 0x3F)
+
+    return bytes(value)
+
+def uuidv7() -> str:
+    """Generate a UUIDv7 in canonical 36-character string form"""
+    return str(uuid.UUID(bytes=uuidv7_bytes()))
@@ -1,114 +1,191 @@
 from os import getenv
 import streamlit as st
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
 from datetime import datetime, date
 import sqlite3
 import os
 from PIL import Image
 import json
 import base64
+import hashlib
 from io import BytesIO
 from openai import OpenAI
-import re
+import httpx
 import gc
-import sys
+import threading
 from contextlib import contextmanager
 
 API_KEY = os.getenv('OPENAI_API_KEY')
 
-# Aggressive memory management
+# Images are downscaled to at most this many pixels and re-encoded at this
+# JPEG quality before analysis; fewer bytes mean a faster upload
+MAX_PIXELS = 250_000
+JPEG_QUALITY = 72
+
+# JPEG uploads already within MAX_PIXELS and under this size are sent as-is
+RAW_JPEG_MAX_BYTES = 1_500_000
+
+# Equipment categories and conditions offered when registering assets
+EQUIPMENT_TYPES = ["Dumbbell", "Barbell Plate", "Kettle Bell", "Resistance Band",
+                   "Medicine Ball", "Cable Attachment", "Bench", "Jump Rope",
+                   "Yoga Mat", "Foam Roller", "Other"]
+CONDITION_OPTIONS = ["Excellent", "Good", "Fair", "Poor", "Needs Repair"]
+
+# AI-reported equipment types mapped to our categories, and the selectbox
+# index of each category and condition
+AI_TYPE_MAPPING = {
+    'dumbbell': 'Dumbbell',
+    'barbell_plate': 'Barbell Plate',
+    'kettlebell': 'Kettle Bell',
+    'medicine_ball': 'Medicine Ball',
+    'resistance_band': 'Resistance Band',
+    'cable_attachment': 'Cable Attachment',
+    'bench': 'Bench',
+    'other': 'Other'
+}
+EQUIPMENT_TYPE_INDEX = {name: index for index, name in enumerate(EQUIPMENT_TYPES)}
+AI_CONDITION_INDEX = {name.lower(): CONDITION_OPTIONS.index(name) for name in ("Excellent", "Good", "Fair", "Poor")}
+
+# Full collection for session start and the Clear Memory button only; Python's
+# default GC thresholds handle everything else
 def force_memory_cleanup():
-    """Aggressively clean up memory"""
+    """Run a full garbage collection"""
     gc.collect()
-    if hasattr(gc, 'set_threshold'):
-        gc.set_threshold(10, 10, 10)
 
-# Simple OpenAI client - never cached
+# One OpenAI client per process, so its HTTP connection pool stays warm between analyses
+@st.cache_resource(show_spinner=False)
+def _shared_openai_client():
+    return OpenAI(
+        api_key=API_KEY,
+        http_client=httpx.Client(limits=httpx.Limits(max_keepalive_connections=4))
+    )
+
 def create_openai_client():
-    """Create fresh OpenAI client"""
+    """Get the shared OpenAI client"""
     if not API_KEY:
         st.error("OpenAI API key not found. Set OPENAI_API_KEY environment variable.")
         return None
     try:
-        return OpenAI(api_key=API_KEY)
+        return _shared_openai_client()
     except Exception as e:
         st.error(f"OpenAI client error: {e}")
         return None
 
-def compress_image_efficiently(image, max_pixels=400000, quality=75):
-    """Compress image for OpenAI while maintaining quality for detection"""
+def compress_image_efficiently(image, max_pixels=MAX_PIXELS):
+    """Downscale and flatten an image to RGB for OpenAI in a single pass.
+
+    The caller's image is left open; intermediate images are closed here.
+    """
     try:
-        width, height = image.size
+        result = image
+
+        # Palette images only resize with NEAREST, so expand them first
+        if result.mode == 'P':
+            result = result.convert('RGBA')
+
+        width, height = result.size
         total_pixels = width * height
 
         if total_pixels > max_pixels:
             scale_factor = (max_pixels / total_pixels) ** 0.5
             new_width = int(width * scale_factor)
             new_height = int(height * scale_factor)
-            image = image.resize((new_width, new_height), Image.Resampling.LANCZOS)
-
-        # Convert to RGB if needed
-        if image.mode in ('RGBA', 'LA', 'P'):
-            rgb_image = Image.new('RGB', image.size, (255, 255, 255))
-            if image.mode == 'P':
-                image = image.convert('RGBA')
-            if image.mode in ('RGBA', 'LA'):
-                rgb_image.paste(image, mask=image.split()[-1])
-            else:
-                rgb_image.paste(image)
-            image.close()
-            image = rgb_image
-        elif image.mode != 'RGB':
-            new_image = image.convert('RGB')
-            image.close()
-            image = new_image
+            resized = result.resize((new_width, new_height), Image.Resampling.LANCZOS)
+            if result is not image:
+                result.close()
+            result = resized
+
+        # Flatten transparency onto white after downscaling, so the composite
+        # runs on the smaller image
+        if result.mode in ('RGBA', 'LA'):
+            flattened = Image.new('RGB', result.size, (255, 255, 255))
+            flattened.paste(result, mask=result.split()[-1])
+        elif result.mode != 'RGB':
+            flattened = result.convert('RGB')
+        else:
+            flattened = result
 
-        return image
+        if flattened is not result and result is not image:
+            result.close()
+        return flattened
 
     except Exception as e:
         st.error(f"Image compression error: {e}")
         return None
 
-def image_to_base64(image):
-    """Convert image to base64 with memory management"""
-    buffer = None
+def preview_image(image, max_side=600):
+    """Image downscaled to fit max_side for display, or the image itself if it already fits"""
+    factor = -(-max(image.size) // max_side)  # Ceiling division
+    if factor <= 1:
+        return image
     try:
-        compressed = compress_image_efficiently(image, max_pixels=300000, quality=80)
+        # Integer box reduction straight from the original, without a full-size copy
+        return image.reduce(factor)
+    except ValueError:
+        # reduce() does not support palette or bilevel images
+        preview = image.copy()
+        preview.thumbnail((max_side, max_side))
+        return preview
+
+# Each Streamlit script thread reuses one buffer for JPEG encoding
+_local = threading.local()
+
+def _encode_buffer():
+    """Thread-local BytesIO reused for JPEG encoding instead of allocating one per image"""
+    buffer = getattr(_local, "buffer", None)
+    if buffer is None:
+        buffer = _local.buffer = BytesIO()
+    buffer.seek(0)
+    buffer.truncate(0)
+    return buffer
+
+def image_to_base64(image, raw_bytes=None):
+    """Convert image to base64 with memory management.
+
+    ``raw_bytes`` are the uploaded file's bytes; a small RGB JPEG is encoded
+    from them directly, skipping the decode/resize/re-encode round trip.
+    """
+    width, height = image.size
+    if (raw_bytes is not None and image.format == 'JPEG' and image.mode == 'RGB'
+            and width * height <= MAX_PIXELS and len(raw_bytes) <= RAW_JPEG_MAX_BYTES):
+        return base64.b64encode(raw_bytes).decode('ascii')
+
+    try:
+        compressed = compress_image_efficiently(image)
         if not compressed:
             return None
 
-        buffer = BytesIO()
-        compressed.save(buffer, format="JPEG", quality=80, optimize=True)
+        buffer = _encode_buffer()
+        # 4:2:0 chroma subsampling, baseline (non-progressive) encoding
+        compressed.save(buffer, format="JPEG", quality=JPEG_QUALITY, optimize=True,
+                        progressive=False, subsampling=2)
 
-        img_bytes = buffer.getvalue()
-        base64_str = base64.b64encode(img_bytes).decode('utf-8')
+        # Encode straight from the buffer's memory instead of copying it out first;
+        # the view is released so the buffer can be truncated for the next image
+        with buffer.getbuffer() as view:
+            base64_str = base64.b64encode(view).decode('ascii')
 
         # Immediate cleanup
-        buffer.close()
-        compressed.close()
-        if compressed != image:
-            del compressed
-        del img_bytes
+        if compressed is not image:
+            compressed.close()
 
-        force_memory_cleanup()
         return base64_str
 
     except Exception as e:
         st.error(f"Base64 conversion error: {e}")
         return None
-    finally:
-        if buffer:
-            buffer.close()
-        force_memory_cleanup()
 
-def analyze_gym_equipment_with_gpt4o(image):
-    """Use GPT-4o to detect both asset tags and equipment in gym images"""
-    client = None
-    base64_image = None
+def analyze_gym_equipment_with_gpt4o(image, raw_bytes=None, detail="low"):
+    """Use GPT-4o to detect both asset tags and equipment in gym images.
 
+    ``detail="low"`` sends a single 512px view of the image; "high" tiles it
+    for small engraved or printed codes at several times the vision tokens.
+    """
     try:
         # Convert to base64
-        base64_image = image_to_base64(image)
+        base64_image = image_to_base64(image, raw_bytes)
         if not base64_image:
             return {"error": "Failed to process image"}
 
@@ -166,49 +243,68 @@ For equipment, be specific about weights and types."""
                             "type": "image_url",
                             "image_url": {
                                 "url": f"data:image/jpeg;base64,{base64_image}",
-                                "detail": "high"  # Use high detail with GPT-4o
+                                "detail": detail
                             }
                         }
                     ]
                 }
             ],
-            max_tokens=1500,
-            temperature=0.1
+            max_tokens=800,
+            temperature=0.1,
+            response_format={"type": "json_object"}  # Response body is the JSON object itself
         )
 
         content = response.choices[0].message.content
 
         # Parse JSON response
         try:
-            # Extract JSON from response
-            json_match = re.search(r'\{.*\}', content, re.DOTALL)
-            if json_match:
-                result = json.loads(json_match.group())
-                return result
-            else:
-                return {"error": "No valid JSON in response", "raw_response": content}
+            result = json.loads(content or "")
         except json.JSONDecodeError:
             return {"error": "Failed to parse JSON", "raw_response": content}
+        if not isinstance(result, dict):
+            return {"error": "No valid JSON in response", "raw_response": content}
+        return result
 
     except Exception as e:
         return {"error": f"Analysis failed: {str(e)}"}
 
-    finally:
-        # Aggressive cleanup
-        if base64_image:
-            del base64_image
-        if client:
-            del client
-        force_memory_cleanup()
+# Successful analyses kept per session, so re-clicking Analyze on the same photo
+# doesn't call OpenAI again
+ANALYSIS_CACHE_SIZE = 8
+
+def analyze_with_cache(image, image_bytes, detail="low"):
+    """analyze_gym_equipment_with_gpt4o, reusing this session's result for identical image bytes"""
+    cache = st.session_state.setdefault('analysis_cache', {})
+    key = (hashlib.sha256(image_bytes).hexdigest(), detail)
+    if key in cache:
+        return cache[key]
+
+    result = analyze_gym_equipment_with_gpt4o(image, image_bytes, detail)
+    if not result.get('error'):
+        if len(cache) >= ANALYSIS_CACHE_SIZE:
+            cache.pop(next(iter(cache)))  # Oldest entry
+        cache[key] = result
+    return result
 
 # Database operations
+@st.cache_resource(show_spinner=False)
+def _shared_connection():
+    """One SQLite connection per process, with a lock serializing its use across sessions"""
+    conn = sqlite3.connect('gym_assets.db', timeout=10, check_same_thread=False)
+    # Per-connection setting; with WAL, commits skip most fsyncs
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn, threading.RLock()
+
 @contextmanager
 def get_db():
-    conn = sqlite3.connect('gym_assets.db', timeout=10)
-    try:
-        yield conn
-    finally:
-        conn.close()
+    conn, lock = _shared_connection()
+    with lock:
+        try:
+            yield conn
+        finally:
+            # The connection stays open, so drop anything left uncommitted
+            if conn.in_transaction:
+                conn.rollback()
 
 def init_database():
     with get_db() as conn:
@@ -233,48 +329,175 @@ def init_database():
                                                                  location TEXT,
                                                                  notes TEXT
                         )''')
+
+        # Indexes for the View Assets sort and filters and per-tag audit history
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_assets_last_seen ON assets(last_seen DESC)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_assets_type_status ON assets(item_type, status)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_audit_tag_ts ON audit_log(asset_tag, timestamp DESC)")
         conn.commit()
 
+        # Stored in the database file, so setting it once is enough
+        conn.execute("PRAGMA journal_mode=WAL")
+
+# Reads are cached across reruns (per filter combination); every write clears them
+@st.cache_data(ttl=30, show_spinner=False)
+def _load_assets(item_type=None, status=None, location_like=None, condition=None, limit=None):
+    clauses = []
+    params = []
+    if item_type:
+        clauses.append("item_type = ?")
+        params.append(item_type)
+    if status:
+        clauses.append("status = ?")
+        params.append(status)
+    if condition:
+        clauses.append("condition = ?")
+        params.append(condition)
+    if location_like:
+        # Case-insensitive "contains", with LIKE wildcards in the input matched literally
+        escaped = location_like.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        clauses.append("location LIKE ? ESCAPE '\\'")
+        params.append(f"%{escaped}%")
+    where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+    query = f"SELECT * FROM assets{where} ORDER BY last_seen DESC"
+    if limit:
+        query += " LIMIT ?"
+        params.append(limit)
+
+    with get_db() as conn:
+        df = pd.read_sql_query(query, conn, params=params)
+
+    # Few distinct values each; categoricals make the cached copy handed out
+    # on every rerun much smaller than object strings
+    for column in ('item_type', 'status', 'condition'):
+        df[column] = df[column].astype('category')
+    return df
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _load_filter_options():
+    with get_db() as conn:
+        types = [row[0] for row in conn.execute(
+            "SELECT DISTINCT item_type FROM assets WHERE item_type IS NOT NULL ORDER BY item_type")]
+        statuses = [row[0] for row in conn.execute(
+            "SELECT DISTINCT status FROM assets WHERE status IS NOT NULL ORDER BY status")]
+        total = conn.execute("SELECT COUNT(*) FROM assets").fetchone()[0]
+    return types, statuses, total
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _load_asset_stats():
+    with get_db() as conn:
+        return pd.read_sql_query(
+            "SELECT status, condition, item_type, COUNT(*) AS c FROM assets "
+            "GROUP BY status, condition, item_type", conn)
+
+# Keyed on the filters rather than the DataFrame, so a hit skips hashing the frame too
+@st.cache_data(ttl=30, show_spinner=False)
+def _assets_csv(item_type=None, status=None, location_like=None):
+    """CSV export of the filtered asset list, written by Arrow's vectorized CSV writer"""
+    table = pa.Table.from_pandas(_load_assets(item_type, status, location_like), preserve_index=False)
+    # The categorical columns arrive as dictionary arrays; write their plain string values
+    table = table.cast(pa.schema([
+        pa.field(field.name, field.type.value_type) if pa.types.is_dictionary(field.type) else field
+        for field in table.schema
+    ]))
+    buffer = pa.BufferOutputStream()
+    # Arrow's "needed" style still quotes the header and every string value,
+    # unlike to_csv's minimal quoting; the parsed data is identical
+    pacsv.write_csv(table, buffer, pacsv.WriteOptions(quoting_style="needed"))
+    return buffer.getvalue().to_pybytes()
+
+@st.cache_data(ttl=30, show_spinner=False)
+def _load_asset(tag):
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT * FROM assets WHERE asset_tag = ?", (tag,))
+        return cursor.fetchone()
+
+def clear_asset_cache():
+    _load_assets.clear()
+    _load_filter_options.clear()
+    _load_asset_stats.clear()
+    _assets_csv.clear()
+    _load_asset.clear()
+
+# Schema setup runs once per process rather than on every rerun; it also
+# opens the shared connection
+@st.cache_resource(show_spinner=False)
+def init_database_once():
+    init_database()
+    return True
+
+# Returned by add_asset when the tag is already registered
+DUPLICATE_ASSET = "duplicate"
+
 def add_asset(asset_data):
+    """Insert an asset and its audit entry in one transaction.
+
+    Returns True on success, DUPLICATE_ASSET if the tag already exists
+    (the UNIQUE constraint is the duplicate check) and False on other errors.
+    """
     try:
-        with get_db() as conn:
-            conn.execute('''INSERT OR REPLACE INTO assets 
+        with get_db() as conn, conn:
+            conn.execute('''INSERT INTO assets 
                 (asset_tag, item_type, description, location, last_seen, status, weight, condition, notes)
                 VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)''', asset_data)
 
+            # Stamped with the asset's last_seen rather than a second datetime.now()
             conn.execute('''INSERT INTO audit_log (asset_tag, action, timestamp, location, notes)
                             VALUES (?, 'REGISTERED', ?, ?, ?)''',
-                         (asset_data[0], datetime.now(), asset_data[3], f"Added {asset_data[1]}"))
-            conn.commit()
+                         (asset_data[0], asset_data[4], asset_data[3], f"Added {asset_data[1]}"))
+        clear_asset_cache()
         return True
+    except sqlite3.IntegrityError:
+        return DUPLICATE_ASSET
     except Exception as e:
         st.error(f"Database error: {e}")
         return False
 
-def get_all_assets():
+# Failed reads are not cached, so they are retried on the next rerun
+def get_all_assets(item_type=None, status=None, location_like=None, condition=None, limit=None):
+    try:
+        return _load_assets(item_type, status, location_like, condition, limit)
+    except:
+        return pd.DataFrame()
+
+def get_assets_csv(item_type=None, status=None, location_like=None):
+    """CSV bytes for the filtered asset list, or None if the export failed"""
+    try:
+        return _assets_csv(item_type, status, location_like)
+    except:
+        return None
+
+def get_asset_stats():
+    """Asset counts per (status, condition, item_type) combination, in column c"""
     try:
-        with get_db() as conn:
-            return pd.read_sql_query("SELECT * FROM assets ORDER BY last_seen DESC", conn)
+        return _load_asset_stats()
     except:
         return pd.DataFrame()
 
+def get_filter_options():
+    """Distinct types and statuses for the View Assets filters, plus the total asset count"""
+    try:
+        return _load_filter_options()
+    except:
+        return [], [], 0
+
 def search_asset(tag):
     try:
-        with get_db() as conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT * FROM assets WHERE asset_tag = ?", (tag,))
-            return cursor.fetchone()
+        return _load_asset(tag)
     except:
         return None
 
 def update_asset_location(tag, location, notes=""):
+    # One timestamp for both rows, so last_seen matches the audit entry
+    now = datetime.now()
     try:
-        with get_db() as conn:
+        with get_db() as conn, conn:
             conn.execute("UPDATE assets SET location = ?, last_seen = ? WHERE asset_tag = ?",
-                         (location, datetime.now(), tag))
+                         (location, now, tag))
             conn.execute("INSERT INTO audit_log (asset_tag, action, timestamp, location, notes) VALUES (?, 'MOVED', ?, ?, ?)",
-                         (tag, datetime.now(), location, notes))
-            conn.commit()
+                         (tag, now, location, notes))
+        clear_asset_cache()
         return True
     except:
         return False
@@ -291,12 +514,12 @@ def main():
         layout="wide"
     )
 
-    init_database()
+    init_database_once()
 
     st.title("🏋️ Gym Asset Registry - AI Powered")
 
     # Memory controls
-    col1, col2, col3 = st.columns([3, 1, 1])
+    col1, col2 = st.columns([4, 1])
     with col1:
         st.markdown("**Powered by AI ** - Advanced gym equipment and asset tag detection")
     with col2:
@@ -306,9 +529,6 @@ def main():
                     del st.session_state[key]
             force_memory_cleanup()
             st.success("Memory cleared!")
-    with col3:
-        memory_mb = sys.getsizeof(st.session_state) / (1024 * 1024)
-        st.metric("Session MB", f"{memory_mb:.1f}")
 
     # Navigation
     page = st.sidebar.selectbox("Choose a page", [
@@ -346,16 +566,22 @@ def main():
                 st.info(f"Image: {original_image.size[0]}x{original_image.size[1]} pixels, {file_size/1024:.0f}KB")
 
                 # Show image
-                display_image = original_image.copy()
-                if display_image.size[0] > 600 or display_image.size[1] > 600:
-                    display_image.thumbnail((600, 600))
+                display_image = preview_image(original_image)
                 st.image(display_image, caption="Image to Analyze", use_column_width=True)
-                display_image.close()
+                if display_image is not original_image:
+                    display_image.close()
+
+                high_detail = st.checkbox("High-detail analysis (slower)",
+                                          help="Use for small engraved or printed codes")
 
                 # Analysis button
                 if st.button("🚀 Analyze Image", type="primary", use_container_width=True):
                     with st.spinner("Analyzing image... This may take 10-20 seconds..."):
-                        analysis_result = analyze_gym_equipment_with_gpt4o(original_image)
+                        analysis_result = analyze_with_cache(
+                            original_image,
+                            image_source.getvalue(),
+                            detail="high" if high_detail else "low"
+                        )
 
                     # Store analysis result in session state to persist across interactions
                     st.session_state.analysis_result = analysis_result
@@ -474,28 +700,12 @@ def main():
                                             )
 
                                             # Map equipment type to our categories
-                                            type_mapping = {
-                                                'dumbbell': 'Dumbbell',
-                                                'barbell_plate': 'Barbell Plate',
-                                                'kettlebell': 'Kettle Bell',
-                                                'medicine_ball': 'Medicine Ball',
-                                                'resistance_band': 'Resistance Band',
-                                                'cable_attachment': 'Cable Attachment',
-                                                'bench': 'Bench',
-                                                'other': 'Other'
-                                            }
-
-                                            equipment_types = ["Dumbbell", "Barbell Plate", "Kettle Bell", "Resistance Band",
-                                                               "Medicine Ball", "Cable Attachment", "Bench", "Jump Rope",
-                                                               "Yoga Mat", "Foam Roller", "Other"]
-
-                                            default_type = type_mapping.get(eq_type.lower(), 'Other')
-                                            type_index = equipment_types.index(default_type) if default_type in equipment_types else -1
+                                            default_type = AI_TYPE_MAPPING.get(eq_type.lower(), 'Other')
 
                                             equipment_type = st.selectbox(
                                                 "Equipment Type *",
-                                                equipment_types,
-                                                index=max(0, type_index),
+                                                EQUIPMENT_TYPES,
+                                                index=EQUIPMENT_TYPE_INDEX.get(default_type, 0),
                                                 key=f"eq_type_{i}"
                                             )
 
@@ -506,18 +716,11 @@ def main():
                                                 placeholder="e.g., Weight Room - Rack 3"
                                             )
 
-                                            # Map AI condition to our options
-                                            condition_options = ["Excellent", "Good", "Fair", "Poor", "Needs Repair"]
-                                            ai_condition = condition.lower()
-                                            if ai_condition in ['excellent', 'good', 'fair', 'poor']:
-                                                condition_index = condition_options.index(ai_condition.title())
-                                            else:
-                                                condition_index = 1  # Default to 'Good'
-
+                                            # Map AI condition to our options, defaulting to 'Good'
                                             condition_select = st.selectbox(
                                                 "Condition",
-                                                condition_options,
-                                                index=condition_index,
+                                                CONDITION_OPTIONS,
+                                                index=AI_CONDITION_INDEX.get(condition.lower(), 1),
                                                 key=f"condition_{i}"
                                             )
 
@@ -537,32 +740,30 @@ def main():
                                             if not asset_tag_input or not location_input:
                                                 st.error("Please fill in Asset Tag and Location")
                                             else:
-                                                # Check if tag already exists
-                                                existing_asset = search_asset(asset_tag_input.upper())
-                                                if existing_asset:
+                                                asset_data = (
+                                                    asset_tag_input.upper(),
+                                                    equipment_type,
+                                                    description,
+                                                    location_input,
+                                                    datetime.now(),
+                                                    "Active",
+                                                    weight if weight != 'unknown' else '',
+                                                    condition_select,
+                                                    notes_input
+                                                )
+
+                                                result = add_asset(asset_data)
+                                                if result == DUPLICATE_ASSET:
                                                     st.error(f"Asset tag '{asset_tag_input}' already exists in database!")
+                                                elif result:
+                                                    st.success(f"🎉 Successfully registered: {asset_tag_input}!")
+                                                    # Mark this item as registered
+                                                    st.session_state.registered_items.add(item_key)
+                                                    st.balloons()
+                                                    # Rerun to update the display
+                                                    st.rerun()
                                                 else:
-                                                    asset_data = (
-                                                        asset_tag_input.upper(),
-                                                        equipment_type,
-                                                        description,
-                                                        location_input,
-                                                        datetime.now(),
-                                                        "Active",
-                                                        weight if weight != 'unknown' else '',
-                                                        condition_select,
-                                                        notes_input
-                                                    )
-
-                                                    if add_asset(asset_data):
-                                                        st.success(f"🎉 Successfully registered: {asset_tag_input}!")
-                                                        # Mark this item as registered
-                                                        st.session_state.registered_items.add(item_key)
-                                                        st.balloons()
-                                                        # Rerun to update the display
-                                                        st.rerun()
-                                                    else:
-                                                        st.error("Failed to register asset. Please try again.")
+                                                    st.error("Failed to register asset. Please try again.")
 
                         else:
                             st.warning("No equipment detected in the image.")
@@ -576,11 +777,9 @@ def main():
 
                 # Cleanup original image
                 original_image.close()
-                force_memory_cleanup()
 
             except Exception as e:
                 st.error(f"Image processing error: {e}")
-                force_memory_cleanup()
 
     elif page == "➕ Register Asset":
         st.header("Register New Asset")
@@ -590,79 +789,79 @@ def main():
 
             with col1:
                 asset_tag = st.text_input("Asset Tag *").upper()
-                item_type = st.selectbox("Type *", ["Dumbbell", "Barbell Plate", "Kettle Bell", "Resistance Band",
-                                                    "Medicine Ball", "Cable Attachment", "Bench", "Jump Rope",
-                                                    "Yoga Mat", "Foam Roller", "Other"])
+                item_type = st.selectbox("Type *", EQUIPMENT_TYPES)
                 description = st.text_input("Description")
                 weight = st.text_input("Weight", placeholder="e.g., 25 lbs")
 
             with col2:
                 location = st.text_input("Location *", placeholder="e.g., Weight Room - Rack 3")
-                condition = st.selectbox("Condition", ["Excellent", "Good", "Fair", "Poor", "Needs Repair"])
+                condition = st.selectbox("Condition", CONDITION_OPTIONS)
                 status = st.selectbox("Status", ["Active", "Out of Service", "Missing"])
                 notes = st.text_area("Notes")
 
             if st.form_submit_button("Register Asset", type="primary"):
                 if asset_tag and item_type and location:
-                    # Check for duplicates
-                    existing = search_asset(asset_tag)
-                    if existing:
+                    asset_data = (asset_tag, item_type, description, location, datetime.now(),
+                                  status, weight, condition, notes)
+                    result = add_asset(asset_data)
+                    if result == DUPLICATE_ASSET:
                         st.error(f"Asset tag '{asset_tag}' already exists!")
+                    elif result:
+                        st.success(f"✅ {asset_tag} registered successfully!")
+                        st.balloons()
                     else:
-                        asset_data = (asset_tag, item_type, description, location, datetime.now(),
-                                      status, weight, condition, notes)
-                        if add_asset(asset_data):
-                            st.success(f"✅ {asset_tag} registered successfully!")
-                            st.balloons()
-                        else:
-                            st.error("Registration failed")
+                        st.error("Registration failed")
                 else:
                     st.error("Please fill in all required fields (*)")
 
     elif page == "📋 View Assets":
         st.header("All Assets")
 
-        assets_df = get_all_assets()
-        if not assets_df.empty:
+        item_types, statuses, total_assets = get_filter_options()
+        if total_assets:
             # Filters
             col1, col2, col3 = st.columns(3)
             with col1:
-                type_filter = st.selectbox("Filter by Type", ["All"] + sorted(assets_df['item_type'].unique().tolist()))
+                type_filter = st.selectbox("Filter by Type", ["All"] + item_types)
             with col2:
-                status_filter = st.selectbox("Filter by Status", ["All"] + sorted(assets_df['status'].unique().tolist()))
+                status_filter = st.selectbox("Filter by Status", ["All"] + statuses)
             with col3:
                 location_filter = st.text_input("Location contains:")
 
-            # Apply filters
-            filtered_df = assets_df.copy()
-            if type_filter != "All":
-                filtered_df = filtered_df[filtered_df['item_type'] == type_filter]
-            if status_filter != "All":
-                filtered_df = filtered_df[filtered_df['status'] == status_filter]
-            if location_filter:
-                filtered_df = filtered_df[filtered_df['location'].str.contains(location_filter, case=False, na=False)]
-
-            st.info(f"Showing {len(filtered_df)} of {len(assets_df)} assets")
-
-            # Display table
-            st.dataframe(
-                filtered_df[['asset_tag', 'item_type', 'description', 'location', 'weight', 'last_seen', 'status', 'condition']],
-                use_container_width=True,
-                column_config={
-                    "asset_tag": "Asset Tag",
-                    "item_type": "Type",
-                    "description": "Description",
-                    "location": "Location",
-                    "weight": "Weight",
-                    "last_seen": st.column_config.DatetimeColumn("Last Seen"),
-                    "status": "Status",
-                    "condition": "Condition"
-                }
+            # Filters are applied in SQL, so only matching rows are loaded
+            filters = dict(
+                item_type=type_filter if type_filter != "All" else None,
+                status=status_filter if status_filter != "All" else None,
+                location_like=location_filter or None
             )
+            filtered_df = get_all_assets(**filters)
 
-            # Export
-            csv = filtered_df.to_csv(index=False)
-            st.download_button("📥 Download CSV", csv, f"gym_assets_{date.today()}.csv", "text/csv")
+            # Also empty (without columns) when the read failed
+            if filtered_df.empty:
+                st.info(f"No assets match these filters ({total_assets} in total)")
+            else:
+                st.info(f"Showing {len(filtered_df)} of {total_assets} assets")
+
+                # Display table
+                st.dataframe(
+                    filtered_df[['asset_tag', 'item_type', 'description', 'location', 'weight', 'last_seen', 'status', 'condition']],
+                    use_container_width=True,
+                    column_config={
+                        "asset_tag": "Asset Tag",
+                        "item_type": "Type",
+                        "description": "Description",
+                        "location": "Location",
+                        "weight": "Weight",
+                        "last_seen": st.column_config.DatetimeColumn("Last Seen"),
+                        "status": "Status",
+                        "condition": "Condition"
+                    }
+                )
+
+                # Export
+                csv = get_assets_csv(**filters)
+                if csv is not None:
+                    st.download_button("📥 Download CSV", csv, f"gym_assets_{date.today()}.csv", "text/csv")
         else:
             st.info("No assets found. Use the Equipment Scanner to add some!")
 
@@ -707,21 +906,24 @@ def main():
     elif page == "📊 Reports":
         st.header("Asset Reports")
 
-        assets_df = get_all_assets()
-        if not assets_df.empty:
+        # Metrics and charts come from a small GROUP BY; only the tables read rows
+        stats = get_asset_stats()
+        if not stats.empty:
+            total_count = int(stats['c'].sum())
+            active_count = int(stats.loc[stats['status'] == 'Active', 'c'].sum())
+            missing_count = int(stats.loc[stats['status'] == 'Missing', 'c'].sum())
+            repair_count = int(stats.loc[stats['condition'] == 'Needs Repair', 'c'].sum())
+
             # Summary metrics
             col1, col2, col3, col4 = st.columns(4)
 
             with col1:
-                st.metric("Total Assets", len(assets_df))
+                st.metric("Total Assets", total_count)
             with col2:
-                active_count = len(assets_df[assets_df['status'] == 'Active'])
                 st.metric("Active", active_count)
             with col3:
-                missing_count = len(assets_df[assets_df['status'] == 'Missing'])
-                st.metric("Missing", missing_count, delta=f"{missing_count/len(assets_df)*100:.1f}%")
+                st.metric("Missing", missing_count, delta=f"{missing_count/total_count*100:.1f}%")
             with col4:
-                repair_count = len(assets_df[assets_df['condition'] == 'Needs Repair'])
                 st.metric("Needs Repair", repair_count)
 
             # Charts
@@ -729,28 +931,34 @@ def main():
 
             with col1:
                 st.subheader("Equipment by Type")
-                type_counts = assets_df['item_type'].value_counts()
+                type_counts = stats.groupby('item_type')['c'].sum().sort_values(ascending=False)
                 st.bar_chart(type_counts)
 
             with col2:
                 st.subheader("Equipment by Status")
-                status_counts = assets_df['status'].value_counts()
+                status_counts = stats.groupby('status')['c'].sum().sort_values(ascending=False)
                 st.bar_chart(status_counts)
 
             # Recent activity
             st.subheader("Recently Added Assets")
-            recent = assets_df.head(10)[['asset_tag', 'item_type', 'location', 'last_seen', 'status']]
+            recent = get_all_assets(limit=10)
+            if not recent.empty:
+                recent = recent[['asset_tag', 'item_type', 'location', 'last_seen', 'status']]
             st.dataframe(recent, use_container_width=True)
 
             # Alerts
             if missing_count > 0:
                 st.error(f"⚠️ {missing_count} assets are marked as missing!")
-                missing_assets = assets_df[assets_df['status'] == 'Missing'][['asset_tag', 'item_type', 'location']]
+                missing_assets = get_all_assets(status='Missing')
+                if not missing_assets.empty:
+                    missing_assets = missing_assets[['asset_tag', 'item_type', 'location']]
                 st.dataframe(missing_assets, use_container_width=True)
 
             if repair_count > 0:
                 st.warning(f"🔧 {repair_count} assets need repair!")
-                repair_assets = assets_df[assets_df['condition'] == 'Needs Repair'][['asset_tag', 'item_type', 'location']]
+                repair_assets = get_all_assets(condition='Needs Repair')
+                if not repair_assets.empty:
+                    repair_assets = repair_assets[['asset_tag', 'item_type', 'location']]
                 st.dataframe(repair_assets, use_container_width=True)
 
         else: